@@ -1,13 +1,99 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, make_response, session, send_from_directory, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, timedelta
+from sqlalchemy import or_, bindparam, case, event, false, func, inspect, select, text, true, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import DatabaseError
+from sqlalchemy.orm import joinedload, selectinload
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import chain, combinations, compress
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+from werkzeug.http import parse_accept_header
+import base64
+import click
+import csv
+import gzip
 import hashlib
+import io
+import mimetypes
+import os
+import pickle
+import random
 import re
+import sys
+import threading
+import time
+import zipfile
+import zlib
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele os assets são servidos apenas em gzip
+    brotli = None
+
+try:
+    import redis
+except ImportError:  # opcional: só é preciso com AVELL_CACHE_URL
+    redis = None
+
+try:
+    import numpy as np
+except ImportError:  # opcional: sem ele a validação em lote usa as funções de um documento
+    np = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # opcional: sem ele a exportação gera apenas CSV
+    pyarrow = None
+
+try:
+    import openpyxl
+    from openpyxl.utils.exceptions import InvalidFileException
+except ImportError:  # opcional: sem ele a importação aceita apenas CSV
+    openpyxl = None
+    InvalidFileException = ValueError
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'Pietro&Yuri29'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///sistema_emprestimos.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('AVELL_DATABASE_URL', 'sqlite:///sistema_emprestimos.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['EMPRESTIMOS_POR_PAGINA'] = 50
+app.config['NOTEBOOKS_POR_PAGINA'] = 24
+app.config['NOTEBOOKS_CONTAGEM_MAXIMA'] = 1000  # acima disso o inventário mostra "mais de" em vez do total
+app.config['IMPORTACAO_LOTE'] = 1000  # linhas por transação na importação em massa
+app.config['IMPORTACAO_ERROS_EXIBIDOS'] = 200
+app.config['ATRASOS_INTERVALO'] = int(os.environ.get('AVELL_ATRASOS_INTERVALO', 60))  # segundos; 0 desliga a thread
+app.config['BUSCA_LIMITE'] = 50
+app.config['BUSCA_CANDIDATOS'] = 2000  # acima disso a busca volta pelos mais recentes, sem bm25
+app.config['SUGESTOES_LIMITE'] = 10  # opções do autocompletar do formulário de empréstimo
+app.config['EXPORTACAO_LOTE'] = 5000  # linhas lidas do cursor por vez (e por row group no Parquet)
+app.config['PAGINACAO_LIMITE_MAXIMO'] = 200
+app.config['LINHAS_POR_BLOCO'] = 100
+app.config['TEMPLATE_PARTES_POR_BLOCO'] = 500
+app.config['FRAGMENTOS_MEMORIA_MAXIMA'] = 32 * 1024 * 1024
+app.config['CACHE_URL'] = os.environ.get('AVELL_CACHE_URL')
+app.config['CACHE_TTL'] = 30
+app.config['CACHE_MAX_ITENS'] = 256
+app.config['ASSETS_PASTA'] = os.path.join(app.static_folder, 'dist')
+app.config['ASSETS_MAX_AGE'] = 365 * 24 * 3600
+app.config['COMPRESSAO_TAMANHO_MINIMO'] = 1024
+app.config['COMPRESSAO_NIVEL_GZIP'] = 6
+app.config['COMPRESSAO_NIVEL_BROTLI'] = 4
+app.config['COMPRESSAO_TIPOS'] = ('text/html', 'text/css', 'text/csv', 'text/plain', 'text/javascript',
+                                  'application/javascript', 'application/json', 'image/svg+xml')
+
+# Templates compilados uma vez e reaproveitados entre reinícios do processo
+os.makedirs(os.path.join(app.instance_path, 'jinja_cache'), exist_ok=True)
+app.jinja_options = {
+    **app.jinja_options,
+    'trim_blocks': True,
+    'lstrip_blocks': True,
+    'bytecode_cache': FileSystemBytecodeCache(os.path.join(app.instance_path, 'jinja_cache')),
+}
 
 db = SQLAlchemy(app)
 
@@ -37,6 +123,19 @@ class Cliente(db.Model):
     data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Notebook(db.Model):
+    __table_args__ = (
+        # Filtros e ordens do inventário. NOCASE: o LIKE do filtro por prefixo
+        # não diferencia maiúsculas e só usa índices com essa collation
+        db.Index('ix_notebook_modelo', text('modelo COLLATE NOCASE')),
+        db.Index('ix_notebook_memoria_ram', text('memoria_ram COLLATE NOCASE')),
+        db.Index('ix_notebook_placa_video', text('placa_video COLLATE NOCASE')),
+        db.Index('ix_notebook_valor', 'valor'),
+        db.Index('ix_notebook_data_aquisicao', 'data_aquisicao'),
+        # Só as unidades disponíveis, em ordem de modelo e número de série
+        db.Index('ix_notebook_disponivel_modelo', 'modelo', 'numero_serie',
+                 sqlite_where=text("status = 'disponivel'")),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     modelo = db.Column(db.String(100), nullable=False)
     processador = db.Column(db.String(100))
@@ -44,23 +143,41 @@ class Notebook(db.Model):
     memoria_ram = db.Column(db.String(50))
     armazenamento = db.Column(db.String(50))
     numero_serie = db.Column(db.String(100), unique=True)
-    status = db.Column(db.String(20), default='disponivel')
+    # active_history carrega o status anterior antes de sobrescrevê-lo, mesmo
+    # quando o notebook veio de uma consulta parcial; a contagem por status depende dele
+    status = db.column_property(db.Column(db.String(20), default='disponivel', index=True), active_history=True)
     valor = db.Column(db.Float)
     data_aquisicao = db.Column(db.DateTime)
     cor = db.Column(db.String(50))
     tela = db.Column(db.String(50))
     sistema_operacional = db.Column(db.String(100))
+    # Incrementada pelo SQLAlchemy a cada UPDATE; identifica o card no cache de fragmentos
+    versao = db.Column(db.Integer, nullable=False, server_default='1')
+    
+    __mapper_args__ = {'version_id_col': versao}
 
 class Emprestimo(db.Model):
+    __table_args__ = (
+        db.Index('ix_emprestimo_status_devolucao_prevista', 'status', 'data_devolucao_prevista'),
+        db.Index('ix_emprestimo_data_emprestimo_id', 'data_emprestimo', 'id'),
+        db.Index('ix_emprestimo_status_data_emprestimo_id', 'status', 'data_emprestimo', 'id'),
+        # Só os atrasados, na ordem da listagem; também serve para desmarcar os que foram devolvidos
+        db.Index('ix_emprestimo_atrasado_data_emprestimo_id', 'data_emprestimo', 'id',
+                 sqlite_where=text('atrasado = 1')),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
-    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable=False)
-    notebook_id = db.Column(db.Integer, db.ForeignKey('notebook.id'), nullable=False)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable=False, index=True)
+    notebook_id = db.Column(db.Integer, db.ForeignKey('notebook.id'), nullable=False, index=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
     data_emprestimo = db.Column(db.DateTime, nullable=False)
     data_devolucao_prevista = db.Column(db.DateTime, nullable=False)
     data_devolucao_real = db.Column(db.DateTime)
     status = db.Column(db.String(20), default='ativo')
     observacoes = db.Column(db.Text)
+    # Mantidos pelo verificador de atrasos (marcar_atrasados), não recalculados a cada página
+    atrasado = db.Column(db.Boolean, nullable=False, default=False, server_default=text('0'))
+    atrasado_em = db.Column(db.DateTime)
     
     cliente = db.relationship('Cliente', backref=db.backref('emprestimos', lazy=True))
     notebook = db.relationship('Notebook', backref=db.backref('emprestimos', lazy=True))
@@ -85,6 +202,9 @@ class Comodato(db.Model):
     valor_total = db.Column(db.Float, nullable=False)
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
     observacoes = db.Column(db.Text)
+    versao = db.Column(db.Integer, nullable=False, server_default='1')
+    
+    __mapper_args__ = {'version_id_col': versao}
 
 class Auditoria(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -95,6 +215,329 @@ class Auditoria(db.Model):
     data_hora = db.Column(db.DateTime, default=datetime.utcnow)
     detalhes = db.Column(db.Text)
 
+class VersaoTabela(db.Model):
+    """Contador de alterações por tabela, incrementado na mesma transação que altera os dados"""
+    tabela = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+
+# Versões das tabelas, usadas nas ETags das páginas
+def marcar_alteracao(*tabelas, conexao=None):
+    """Incrementa a versão das tabelas; chamar após escritas em massa que não passam pelo flush do ORM"""
+    nomes = sorted({getattr(tabela, '__tablename__', tabela) for tabela in tabelas})
+    if not nomes:
+        return
+    versoes = VersaoTabela.__table__
+    comando = sqlite_insert(versoes).values([{'tabela': nome, 'versao': 1} for nome in nomes])
+    comando = comando.on_conflict_do_update(index_elements=[versoes.c.tabela],
+                                            set_={'versao': versoes.c.versao + 1})
+    (conexao or db.session.connection()).execute(comando)
+
+@event.listens_for(db.session, 'after_flush')
+def registrar_alteracoes(sessao, contexto):
+    """Toda tabela com registros inseridos, alterados ou removidos no flush ganha uma versão nova"""
+    tabelas = {objeto.__tablename__ for objeto in sessao.new}
+    tabelas.update(objeto.__tablename__ for objeto in sessao.deleted)
+    tabelas.update(objeto.__tablename__ for objeto in sessao.dirty if sessao.is_modified(objeto))
+    tabelas.discard(VersaoTabela.__tablename__)
+    if tabelas:
+        marcar_alteracao(*tabelas, conexao=sessao.connection())
+
+def versoes_tabelas(*modelos):
+    """Versão atual de cada tabela (modelo ou nome), em uma única consulta pela chave primária"""
+    nomes = [getattr(modelo, '__tablename__', modelo) for modelo in modelos]
+    versoes = dict(db.session.execute(
+        select(VersaoTabela.tabela, VersaoTabela.versao).where(VersaoTabela.tabela.in_(nomes))
+    ).all())
+    return [versoes.get(nome, 0) for nome in nomes]
+
+class EmprestimoMensal(db.Model):
+    """Empréstimos e devoluções por mês, atualizados no flush de cada empréstimo"""
+    mes = db.Column(db.String(7), primary_key=True)  # AAAA-MM
+    emprestimos = db.Column(db.Integer, nullable=False, default=0)
+    devolucoes = db.Column(db.Integer, nullable=False, default=0)
+
+def somar_contadores(conexao, modelo, linhas):
+    """Soma as linhas às de mesma chave primária na tabela de contadores, criando as que faltam"""
+    if not linhas:
+        return
+    tabela = modelo.__table__
+    comando = sqlite_insert(tabela).values(linhas)
+    comando = comando.on_conflict_do_update(index_elements=list(tabela.primary_key), set_={
+        coluna.name: coluna + comando.excluded[coluna.name]
+        for coluna in tabela.columns if not coluna.primary_key
+    })
+    conexao.execute(comando)
+
+# Rollup mensal dos empréstimos
+MESES = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+def contribuicao_mensal(data_emprestimo, status, data_devolucao_real):
+    """Colunas do rollup em que um empréstimo com esses valores é contado"""
+    if data_emprestimo is not None:
+        yield data_emprestimo.strftime('%Y-%m'), 'emprestimos'
+    if status == 'finalizado' and data_devolucao_real is not None:
+        yield data_devolucao_real.strftime('%Y-%m'), 'devolucoes'
+
+def valores_anteriores(objeto, atributos):
+    """Valores dos atributos antes das alterações pendentes no flush"""
+    estado = inspect(objeto)
+    valores = []
+    for atributo in atributos:
+        historico = estado.attrs[atributo].history
+        valores.append((historico.deleted or historico.unchanged or [getattr(objeto, atributo)])[0])
+    return valores
+
+@event.listens_for(db.session, 'after_flush')
+def atualizar_emprestimo_mensal(sessao, contexto):
+    """Aplica ao rollup a diferença causada pelos empréstimos criados, devolvidos ou removidos"""
+    atributos = ('data_emprestimo', 'status', 'data_devolucao_real')
+    deltas = {}
+    
+    def somar(valores, sinal):
+        for mes, coluna in contribuicao_mensal(*valores):
+            deltas.setdefault(mes, {'emprestimos': 0, 'devolucoes': 0})[coluna] += sinal
+    
+    for objeto in sessao.new:
+        if isinstance(objeto, Emprestimo):
+            somar([getattr(objeto, atributo) for atributo in atributos], 1)
+    for objeto in sessao.deleted:
+        if isinstance(objeto, Emprestimo):
+            somar(valores_anteriores(objeto, atributos), -1)
+    for objeto in sessao.dirty:
+        if isinstance(objeto, Emprestimo) and sessao.is_modified(objeto):
+            somar(valores_anteriores(objeto, atributos), -1)
+            somar([getattr(objeto, atributo) for atributo in atributos], 1)
+    
+    linhas = [{'mes': mes, **colunas} for mes, colunas in sorted(deltas.items()) if any(colunas.values())]
+    somar_contadores(sessao.connection(), EmprestimoMensal, linhas)
+
+def serie_mensal(meses):
+    """Últimos meses do rollup, incluindo os meses sem movimento; custo proporcional aos meses"""
+    hoje = date.today()
+    chaves = []
+    for atras in range(meses - 1, -1, -1):
+        ano, mes = divmod(hoje.year * 12 + hoje.month - 1 - atras, 12)
+        chaves.append(f'{ano:04d}-{mes + 1:02d}')
+    
+    linhas = {linha.mes: linha for linha in EmprestimoMensal.query.filter(EmprestimoMensal.mes.in_(chaves))}
+    vazio = EmprestimoMensal(emprestimos=0, devolucoes=0)
+    return {
+        'rotulos': [f'{MESES[int(chave[5:]) - 1]}/{chave[2:4]}' for chave in chaves],
+        'emprestimos': [linhas.get(chave, vazio).emprestimos for chave in chaves],
+        'devolucoes': [linhas.get(chave, vazio).devolucoes for chave in chaves],
+    }
+
+def reconstruir_emprestimo_mensal():
+    """Recalcula o rollup inteiro a partir da tabela de empréstimos"""
+    mes_emprestimo = func.strftime('%Y-%m', Emprestimo.data_emprestimo)
+    mes_devolucao = func.strftime('%Y-%m', Emprestimo.data_devolucao_real)
+    emprestimos = dict(db.session.query(mes_emprestimo, func.count(Emprestimo.id))
+                       .filter(Emprestimo.data_emprestimo.isnot(None))
+                       .group_by(mes_emprestimo).all())
+    devolucoes = dict(db.session.query(mes_devolucao, func.count(Emprestimo.id))
+                      .filter(Emprestimo.status == 'finalizado', Emprestimo.data_devolucao_real.isnot(None))
+                      .group_by(mes_devolucao).all())
+    
+    EmprestimoMensal.query.delete()
+    db.session.add_all(
+        EmprestimoMensal(mes=mes, emprestimos=emprestimos.get(mes, 0), devolucoes=devolucoes.get(mes, 0))
+        for mes in sorted(set(emprestimos) | set(devolucoes))
+    )
+    db.session.commit()
+    return len(set(emprestimos) | set(devolucoes))
+
+@app.cli.command('reconstruir-mensal')
+def reconstruir_mensal_comando():
+    """Recalcula a tabela emprestimo_mensal a partir dos empréstimos"""
+    meses = reconstruir_emprestimo_mensal()
+    print(f"✅ Rollup mensal reconstruído: {meses} meses")
+
+class NotebookStatusContagem(db.Model):
+    """Quantidade de notebooks em cada status, atualizada no flush de cada notebook"""
+    __tablename__ = 'notebook_status_contagem'
+    status = db.Column(db.String(20), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+# Contagem de notebooks por status
+STATUS_NOTEBOOK = {'disponivel': 'Disponíveis', 'emprestado': 'Emprestados', 'manutencao': 'Manutenção'}
+
+@event.listens_for(db.session, 'after_flush')
+def atualizar_contagem_status(sessao, contexto):
+    """Aplica à contagem por status os notebooks criados, removidos ou que mudaram de status"""
+    deltas = {}
+    
+    def somar(status, sinal):
+        if status is not None:
+            deltas[status] = deltas.get(status, 0) + sinal
+    
+    for objeto in sessao.new:
+        if isinstance(objeto, Notebook):
+            somar(objeto.status, 1)
+    for objeto in sessao.deleted:
+        if isinstance(objeto, Notebook):
+            somar(*valores_anteriores(objeto, ['status']), -1)
+    for objeto in sessao.dirty:
+        if isinstance(objeto, Notebook) and sessao.is_modified(objeto):
+            somar(*valores_anteriores(objeto, ['status']), -1)
+            somar(objeto.status, 1)
+    
+    linhas = [{'status': status, 'total': total} for status, total in sorted(deltas.items()) if total]
+    somar_contadores(sessao.connection(), NotebookStatusContagem, linhas)
+
+def distribuicao_status_notebooks():
+    """Rótulos e totais por status lidos da tabela de contadores; custo independente da frota"""
+    totais = dict.fromkeys(STATUS_NOTEBOOK, 0)
+    for linha in NotebookStatusContagem.query.filter(NotebookStatusContagem.total != 0):
+        totais[linha.status] = linha.total
+    return {
+        'rotulos': [STATUS_NOTEBOOK.get(status, status.title()) for status in totais],
+        'totais': list(totais.values()),
+    }
+
+def contagem_status_real():
+    """Contagem por status recalculada com GROUP BY sobre a tabela de notebooks"""
+    return dict(db.session.query(Notebook.status, func.count(Notebook.id))
+                .filter(Notebook.status.isnot(None))
+                .group_by(Notebook.status).all())
+
+def divergencias_status():
+    """Status cujo contador difere da contagem real: {status: (contador, real)}"""
+    contadores = {linha.status: linha.total for linha in NotebookStatusContagem.query}
+    reais = contagem_status_real()
+    return {
+        status: (contadores.get(status, 0), reais.get(status, 0))
+        for status in sorted(set(contadores) | set(reais))
+        if contadores.get(status, 0) != reais.get(status, 0)
+    }
+
+def reconstruir_contagem_status():
+    """Recalcula os contadores de status a partir da tabela de notebooks"""
+    reais = contagem_status_real()
+    NotebookStatusContagem.query.delete()
+    db.session.add_all(NotebookStatusContagem(status=status, total=total) for status, total in sorted(reais.items()))
+    db.session.commit()
+    return reais
+
+@app.cli.command('verificar-status')
+def verificar_status_comando():
+    """Falha se a contagem de notebooks ou de empréstimos por status divergir das tabelas"""
+    divergencias = divergencias_status()
+    for status, (contador, real) in divergencias.items():
+        print(f"❌ {status}: contador {contador}, real {real}")
+    divergencias_emp = divergencias_emprestimos()
+    for (status, atrasado), (contador, real) in divergencias_emp.items():
+        print(f"❌ empréstimos {status}{' atrasados' if atrasado else ''}: contador {contador}, real {real}")
+    if divergencias or divergencias_emp:
+        print("💡 Corrija com: flask --app app reconstruir-status")
+        raise SystemExit(1)
+    print("✅ Contagem por status consistente")
+
+@app.cli.command('reconstruir-status')
+def reconstruir_status_comando():
+    """Recalcula as tabelas notebook_status_contagem e emprestimo_status_contagem"""
+    reais = reconstruir_contagem_status()
+    print(f"✅ Contagem por status reconstruída: {sum(reais.values())} notebooks em {len(reais)} status")
+    reais = reconstruir_contagem_emprestimos()
+    print(f"✅ Contagem de empréstimos reconstruída: {sum(reais.values())} empréstimos")
+
+class EmprestimoStatusContagem(db.Model):
+    """Quantidade de empréstimos por status e atraso, atualizada no flush e pelo verificador de atrasos"""
+    __tablename__ = 'emprestimo_status_contagem'
+    status = db.Column(db.String(20), primary_key=True)
+    atrasado = db.Column(db.Boolean, primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+# Contagem de empréstimos por status e atraso (cartões da listagem)
+def somar_contagem_emprestimos(conexao, deltas):
+    """Aplica deltas {(status, atrasado): quantidade} à tabela de contadores"""
+    linhas = [{'status': status, 'atrasado': atrasado, 'total': total}
+              for (status, atrasado), total in sorted(deltas.items()) if total]
+    somar_contadores(conexao, EmprestimoStatusContagem, linhas)
+
+@event.listens_for(db.session, 'after_flush')
+def atualizar_contagem_emprestimos(sessao, contexto):
+    """Aplica à contagem os empréstimos criados, removidos ou que mudaram de status ou atraso"""
+    atributos = ('status', 'atrasado')
+    deltas = {}
+    
+    def somar(valores, sinal):
+        status, atrasado = valores
+        if status is not None:
+            chave = (status, bool(atrasado))
+            deltas[chave] = deltas.get(chave, 0) + sinal
+    
+    for objeto in sessao.new:
+        if isinstance(objeto, Emprestimo):
+            somar([getattr(objeto, atributo) for atributo in atributos], 1)
+    for objeto in sessao.deleted:
+        if isinstance(objeto, Emprestimo):
+            somar(valores_anteriores(objeto, atributos), -1)
+    for objeto in sessao.dirty:
+        if isinstance(objeto, Emprestimo) and sessao.is_modified(objeto):
+            somar(valores_anteriores(objeto, atributos), -1)
+            somar([getattr(objeto, atributo) for atributo in atributos], 1)
+    
+    somar_contagem_emprestimos(sessao.connection(), deltas)
+
+def contagem_emprestimos_real():
+    """Contagem por status e atraso recalculada com GROUP BY sobre a tabela de empréstimos"""
+    return {(status, bool(atrasado)): total for status, atrasado, total in
+            db.session.query(Emprestimo.status, Emprestimo.atrasado, func.count(Emprestimo.id))
+            .filter(Emprestimo.status.isnot(None))
+            .group_by(Emprestimo.status, Emprestimo.atrasado).all()}
+
+def divergencias_emprestimos():
+    """Chaves (status, atrasado) cujo contador difere da contagem real: {chave: (contador, real)}"""
+    contadores = {(linha.status, linha.atrasado): linha.total for linha in EmprestimoStatusContagem.query}
+    reais = contagem_emprestimos_real()
+    return {
+        chave: (contadores.get(chave, 0), reais.get(chave, 0))
+        for chave in sorted(set(contadores) | set(reais))
+        if contadores.get(chave, 0) != reais.get(chave, 0)
+    }
+
+def reconstruir_contagem_emprestimos():
+    """Recalcula os contadores de empréstimos a partir da tabela de empréstimos"""
+    reais = contagem_emprestimos_real()
+    EmprestimoStatusContagem.query.delete()
+    db.session.add_all(EmprestimoStatusContagem(status=status, atrasado=atrasado, total=total)
+                       for (status, atrasado), total in sorted(reais.items()))
+    db.session.commit()
+    return reais
+
+# Relacionamentos lidos por cada listagem. Many-to-one vem no mesmo SELECT
+# (joinedload); coleções vêm em um SELECT ... IN extra (selectinload).
+CARREGAMENTOS = {
+    'emprestimos': (Emprestimo, ['cliente', 'notebook', 'usuario']),
+    'proximas_devolucoes': (Emprestimo, ['cliente', 'notebook']),
+    'clientes': (Cliente, []),
+    'notebooks': (Notebook, []),
+    'comodatos': (Comodato, []),
+    'usuarios': (Usuario, []),
+}
+
+def consulta_lista(view):
+    """Query base de uma listagem com os relacionamentos da view já carregados"""
+    modelo, relacionamentos = CARREGAMENTOS[view]
+    opcoes = []
+    for nome in relacionamentos:
+        rel = getattr(modelo, nome)
+        opcoes.append(selectinload(rel) if rel.property.uselist else joinedload(rel, innerjoin=True))
+    return modelo.query.options(*opcoes)
+
+def contagem_emprestimos(coluna):
+    """Subquery (id, total) com o número de empréstimos agrupado pela chave estrangeira"""
+    return db.session.query(
+        coluna.label('id'),
+        func.count(Emprestimo.id).label('total')
+    ).group_by(coluna).subquery()
+
+def com_contagem_emprestimos(query, modelo, coluna):
+    """Anexa a cada linha da query o total de empréstimos do registro (modelo, total)"""
+    contagem = contagem_emprestimos(coluna)
+    return query.add_columns(func.coalesce(contagem.c.total, 0))\
+        .outerjoin(contagem, contagem.c.id == modelo.id)
+
 # Funções auxiliares para CPF/CNPJ - CORRIGIDAS
 def validar_cpf(cpf):
     """Valida CPF"""
@@ -180,6 +623,205 @@ def validar_cpf_cnpj(numero):
     else:
         return False
 
+# Validação em lote: os documentos de mesmo tamanho viram uma matriz de dígitos
+# e cada dígito verificador sai de um produto escalar com os pesos
+NAO_DIGITO = re.compile(r'[^0-9]')
+PESOS_DOCUMENTO = {
+    11: ([10, 9, 8, 7, 6, 5, 4, 3, 2], [11, 10, 9, 8, 7, 6, 5, 4, 3, 2]),
+    14: ([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]),
+}
+# Mesmo formato de formatar_cpf_cnpj; cada _ recebe um dígito
+MASCARAS_DOCUMENTO = {11: '___.___.___-__', 14: '__.___.___/____-__'}
+
+@dataclass
+class DocumentosValidados:
+    """Resultado de validar_documentos, alinhado com a sequência de entrada"""
+    validos: list
+    digitos: list
+    formatados: list
+
+def somente_digitos(documentos):
+    """Documentos sem o que não é dígito, filtrados em um único buffer separado por quebras de linha"""
+    texto = '\n'.join(documentos)
+    if texto.count('\n') != len(documentos) - 1:  # vazio, ou algum documento com quebra de linha
+        return [NAO_DIGITO.sub('', documento) for documento in documentos]
+    buffer = np.frombuffer(texto.encode('utf-8', 'surrogatepass'), dtype=np.uint8)
+    manter = ((buffer >= ord('0')) & (buffer <= ord('9'))) | (buffer == ord('\n'))
+    return buffer[manter].tobytes().decode('ascii').split('\n')
+
+def digito_verificador(somas):
+    resto = somas % 11
+    return np.where(resto < 2, 0, 11 - resto)
+
+def validar_documentos(documentos):
+    """Valida, normaliza e formata vários CPFs/CNPJs de uma vez.
+
+    Dá o mesmo resultado de validar_cpf_cnpj e formatar_cpf_cnpj aplicados a
+    cada documento; sem NumPy, é exatamente isso que faz.
+    """
+    if np is None:
+        digitos = [NAO_DIGITO.sub('', documento) for documento in documentos]
+        return DocumentosValidados([validar_cpf_cnpj(numero) for numero in digitos], digitos,
+                                   [formatar_cpf_cnpj(numero) for numero in digitos])
+    
+    digitos = somente_digitos(documentos)
+    validos = np.zeros(len(digitos), dtype=bool)
+    formatados = list(digitos)
+    tamanhos = np.fromiter(map(len, digitos), dtype=np.int64, count=len(digitos))
+    for tamanho, (pesos1, pesos2) in PESOS_DOCUMENTO.items():
+        selecao = tamanhos == tamanho
+        if not selecao.any():
+            continue
+        caracteres = np.frombuffer(''.join(compress(digitos, selecao)).encode('ascii'), dtype=np.uint8)\
+            .reshape(-1, tamanho)
+        matriz = caracteres.astype(np.int64) - ord('0')
+        validos[selecao] = (
+            (matriz != matriz[:, :1]).any(axis=1)
+            & (digito_verificador(matriz[:, :len(pesos1)] @ pesos1) == matriz[:, -2])
+            & (digito_verificador(matriz[:, :len(pesos2)] @ pesos2) == matriz[:, -1])
+        )
+        
+        # Todos os documentos do grupo formatados em um único buffer, fatiado no final
+        mascara = np.frombuffer(MASCARAS_DOCUMENTO[tamanho].encode('ascii'), dtype=np.uint8)
+        saida = np.tile(mascara, (len(caracteres), 1))
+        saida[:, mascara == ord('_')] = caracteres
+        texto = saida.tobytes().decode('ascii')
+        largura = len(mascara)
+        for indice, posicao in zip(np.flatnonzero(selecao).tolist(), range(0, len(texto), largura)):
+            formatados[indice] = texto[posicao:posicao + largura]
+    return DocumentosValidados(validos.tolist(), digitos, formatados)
+
+def documentos_aleatorios(quantidade, semente=0):
+    """CPFs e CNPJs válidos, inválidos, com pontuação e malformados, para comparar os validadores"""
+    sorteio = random.Random(semente)
+    documentos = []
+    for _ in range(quantidade):
+        tamanho = sorteio.choice([11, 14])
+        numero = [sorteio.randrange(10) for _ in range(tamanho)]
+        caso = sorteio.randrange(8)
+        if caso < 4:
+            # Dígitos verificadores corretos, calculados à parte das duas implementações
+            for posicao, pesos in enumerate(PESOS_DOCUMENTO[tamanho]):
+                resto = sum(d * p for d, p in zip(numero, pesos)) % 11
+                numero[tamanho - 2 + posicao] = 0 if resto < 2 else 11 - resto
+        elif caso == 4:
+            numero = [numero[0]] * tamanho
+        elif caso == 5:
+            numero = numero[:sorteio.randrange(tamanho)] + numero[:sorteio.randrange(3)]
+        documento = ''.join(map(str, numero))
+        if sorteio.random() < 0.5:
+            documento = formatar_cpf_cnpj(documento)
+        if caso == 6:
+            documento = documento[:3] + sorteio.choice(['a', ' ', '/', '١', '']) + documento[3:]
+        documentos.append(documento)
+    return documentos
+
+@app.cli.command('comparar-validacao')
+@click.option('--quantidade', type=int, default=200000, help='Documentos sorteados')
+@click.option('--semente', type=int, default=0)
+def comparar_validacao_comando(quantidade, semente):
+    """Confere que a validação em lote dá o mesmo resultado das funções de um documento e compara os tempos"""
+    documentos = documentos_aleatorios(quantidade, semente)
+    
+    inicio = time.perf_counter()
+    escalar = [(validar_cpf_cnpj(documento), NAO_DIGITO.sub('', documento), formatar_cpf_cnpj(documento))
+               for documento in documentos]
+    tempo_escalar = time.perf_counter() - inicio
+    
+    inicio = time.perf_counter()
+    lote = validar_documentos(documentos)
+    tempo_lote = time.perf_counter() - inicio
+    
+    diferentes = [(documento, esperado, obtido)
+                  for documento, esperado, obtido in zip(documentos, escalar, zip(lote.validos, lote.digitos, lote.formatados))
+                  if esperado != obtido]
+    for documento, esperado, obtido in diferentes[:20]:
+        print(f"❌ {documento!r}: um a um {esperado}, em lote {obtido}")
+    print(f"{'🔢 NumPy' if np is not None else '⚠️ NumPy não instalado, lote usa as funções de um documento'}: "
+          f"{sum(lote.validos)} válidos de {quantidade}")
+    print(f"⏱️ um a um {tempo_escalar * 1000:.0f} ms, em lote {tempo_lote * 1000:.0f} ms "
+          f"({tempo_escalar / tempo_lote if tempo_lote else 0:.1f}x)")
+    if diferentes:
+        raise SystemExit(1)
+    print("✅ Resultados idênticos")
+
+@app.cli.command('verificar-documentos')
+@click.option('--bloco', type=int, default=10000, help='Clientes validados por vez')
+def verificar_documentos_comando(bloco):
+    """Lista clientes com CPF/CNPJ inválido ou fora do formato padrão"""
+    total = invalidos = fora_do_formato = 0
+    consulta = select(Cliente.id, Cliente.cpf_cnpj).order_by(Cliente.id).execution_options(yield_per=bloco)
+    for linhas in db.session.execute(consulta).partitions():
+        resultado = validar_documentos([cpf_cnpj for _, cpf_cnpj in linhas])
+        for (id, cpf_cnpj), valido, formatado in zip(linhas, resultado.validos, resultado.formatados):
+            if not valido:
+                invalidos += 1
+                print(f"❌ cliente {id}: {cpf_cnpj} inválido")
+            elif cpf_cnpj != formatado:
+                fora_do_formato += 1
+                print(f"⚠️ cliente {id}: {cpf_cnpj} deveria ser {formatado}")
+        total += len(linhas)
+    print(f"✅ {total} clientes verificados: {invalidos} inválidos, {fora_do_formato} fora do formato")
+
+# Paginação por cursor (keyset)
+def codificar_cursor(data, id):
+    """Gera um cursor opaco para a posição (data, id)"""
+    bruto = f'{data.isoformat()}|{id}'.encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+def decodificar_cursor(cursor):
+    """Retorna (data, id) do cursor ou None se for inválido"""
+    if not cursor:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        data, id = bruto.rsplit('|', 1)
+        return datetime.fromisoformat(data), int(id)
+    except ValueError:
+        return None
+
+def obter_limite(padrao):
+    """Lê o tamanho de página da query string, respeitando o máximo configurado"""
+    limite = request.args.get('limite', padrao, type=int)
+    return max(1, min(limite, app.config['PAGINACAO_LIMITE_MAXIMO']))
+
+def paginar_keyset_query(query, coluna, coluna_id, limite, apos=None, antes=None):
+    """Query de uma página em ordem decrescente de (coluna, id), sem OFFSET"""
+    if antes:
+        query = query.filter(tuple_(coluna, coluna_id) > antes)\
+            .order_by(coluna.asc(), coluna_id.asc())
+    else:
+        if apos:
+            query = query.filter(tuple_(coluna, coluna_id) < apos)
+        query = query.order_by(coluna.desc(), coluna_id.desc())
+    
+    return query.limit(limite + 1)
+
+def paginar_keyset(query, coluna, coluna_id, limite, apos=None, antes=None):
+    """Pagina em ordem decrescente de (coluna, id) sem OFFSET.
+
+    Cada página busca no máximo limite + 1 linhas a partir do cursor, então o
+    custo não depende do tamanho da tabela.
+    """
+    itens = paginar_keyset_query(query, coluna, coluna_id, limite, apos, antes).all()
+    tem_mais = len(itens) > limite
+    itens = itens[:limite]
+    
+    if antes:
+        itens.reverse()
+        tem_proxima, tem_anterior = True, tem_mais
+    else:
+        tem_proxima, tem_anterior = tem_mais, apos is not None
+    
+    def cursor(item):
+        return codificar_cursor(getattr(item, coluna.key), getattr(item, coluna_id.key))
+    
+    return {
+        'itens': itens,
+        'proximo': cursor(itens[-1]) if itens and tem_proxima else None,
+        'anterior': cursor(itens[0]) if itens and tem_anterior else None,
+    }
+
 @app.context_processor
 def inject_now():
     return {
@@ -188,2210 +830,551 @@ def inject_now():
         'tema': session.get('tema', 'escuro')
     }
 
-CSS_GLOBAL = '''
-<style>
-    :root {
-        --avell-red: #e30613;
-        --avell-dark: #1a1a1a;
-        --avell-darker: #0d0d0d;
-        --avell-light: #ffffff;
-        --avell-silver: #f8f9fa;
-        --text-primary: #333333;
-        --text-secondary: #666666;
-        --bg-primary: #ffffff;
-        --bg-secondary: #f8f9fa;
-        --border-color: #dee2e6;
-    }
-
-    [data-tema="escuro"] {
-        --text-primary: #ffffff;
-        --text-secondary: #cccccc;
-        --bg-primary: #1a1a1a;
-        --bg-secondary: #0d0d0d;
-        --border-color: #333333;
-    }
-
-    body {
-        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-        background: var(--bg-secondary);
-        color: var(--text-primary);
-        transition: all 0.3s ease;
-    }
-
-    .avell-navbar {
-        background: linear-gradient(135deg, var(--avell-darker) 0%, var(--avell-dark) 100%);
-        border-bottom: 3px solid var(--avell-red);
-    }
-
-    .navbar-brand {
-        color: var(--avell-light) !important;
-        font-weight: bold;
-        font-size: 1.3rem;
-    }
-
-    .btn-avell {
-        background: var(--avell-red);
-        color: white;
-        border: none;
-        font-weight: 600;
-        transition: all 0.3s;
-    }
-
-    .btn-avell:hover {
-        background: #c40510;
-        color: white;
-        transform: translateY(-1px);
-        box-shadow: 0 4px 8px rgba(227, 6, 19, 0.3);
-    }
-
-    .sidebar {
-        background: linear-gradient(180deg, var(--avell-dark) 0%, var(--avell-darker) 100%);
-        min-height: calc(100vh - 56px);
-        padding: 0;
-    }
-
-    .sidebar-link {
-        color: #ccc;
-        text-decoration: none;
-        display: block;
-        padding: 15px 25px;
-        border-bottom: 1px solid #333;
-        transition: all 0.3s;
-        font-weight: 500;
-    }
-
-    .sidebar-link:hover {
-        color: var(--avell-light);
-        background: rgba(227, 6, 19, 0.1);
-        padding-left: 30px;
-    }
-
-    .sidebar-link.active {
-        color: var(--avell-light);
-        background: var(--avell-red);
-        border-left: 4px solid var(--avell-light);
-    }
-
-    .card {
-        border: 1px solid var(--border-color);
-        border-radius: 12px;
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.08);
-        margin-bottom: 24px;
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-        background: var(--bg-primary);
-    }
-
-    .card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 8px 30px rgba(0, 0, 0, 0.12);
-    }
-
-    .card-header {
-        background: linear-gradient(135deg, var(--avell-dark) 0%, var(--avell-darker) 100%);
-        color: var(--avell-light);
-        font-weight: 600;
-        border-radius: 12px 12px 0 0 !important;
-        padding: 20px 25px;
-        border: none;
-    }
-
-    .card-header i {
-        color: var(--avell-red);
-        margin-right: 8px;
-    }
-
-    .stats-card {
-        text-align: center;
-        padding: 30px 20px;
-        border-radius: 12px;
-        transition: all 0.3s ease;
-        background: var(--bg-primary);
-        color: var(--text-primary);
-    }
-
-    .stats-card:hover {
-        transform: translateY(-8px);
-    }
-
-    .stats-number {
-        font-size: 3rem;
-        font-weight: 700;
-        color: var(--avell-red);
-        margin-bottom: 5px;
-        line-height: 1;
-    }
-
-    .stats-label {
-        font-size: 0.9rem;
-        color: var(--text-secondary);
-        font-weight: 600;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-
-    .main-content {
-        padding: 30px;
-        min-height: calc(100vh - 56px);
-        background: var(--bg-secondary);
-    }
-
-    .table {
-        background: var(--bg-primary);
-        color: var(--text-primary);
-    }
-
-    .table th {
-        background: linear-gradient(135deg, var(--avell-dark) 0%, var(--avell-darker) 100%);
-        color: var(--avell-light);
-        font-weight: 600;
-        border: none;
-        padding: 15px;
-    }
-
-    .table td {
-        border-color: var(--border-color);
-        padding: 15px;
-        vertical-align: middle;
-        color: var(--text-primary);
-    }
-
-    .table-hover tbody tr:hover {
-        background-color: rgba(227, 6, 19, 0.05);
-    }
-
-    .login-container {
-        max-width: 400px;
-        margin: 100px auto;
-        padding: 40px;
-        background: var(--bg-primary);
-        border-radius: 16px;
-        box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
-    }
-
-    .login-logo {
-        text-align: center;
-        margin-bottom: 30px;
-        color: var(--avell-red);
-    }
-
-    .badge-disponivel { background: #28a745; color: white; }
-    .badge-emprestado { background: #dc3545; color: white; }
-    .badge-manutencao { background: #ffc107; color: black; }
-    .badge-ativo { background: #28a745; color: white; }
-    .badge-finalizado { background: #6c757d; color: white; }
-    .badge-atrasado { background: #dc3545; color: white; }
-
-    .notebook-card {
-        transition: all 0.3s ease;
-    }
-
-    .notebook-card:hover {
-        transform: translateY(-5px);
-    }
-
-    .comodato-card {
-        border-left: 4px solid var(--avell-red);
-    }
-
-    .valor-destaque {
-        font-size: 1.5rem;
-        font-weight: 700;
-        color: var(--avell-red);
-    }
-
-    .form-control, .form-select {
-        background: var(--bg-primary);
-        color: var(--text-primary);
-        border: 1px solid var(--border-color);
-    }
-
-    .form-control:focus, .form-select:focus {
-        background: var(--bg-primary);
-        color: var(--text-primary);
-        border-color: var(--avell-red);
-        box-shadow: 0 0 0 0.2rem rgba(227, 6, 19, 0.25);
-    }
-
-    .form-label {
-        color: var(--text-primary);
-        font-weight: 500;
-    }
-
-    .text-muted {
-        color: var(--text-secondary) !important;
-    }
-
-    .btn-toggle-tema {
-        background: transparent;
-        border: 2px solid var(--avell-red);
-        color: var(--avell-red);
-        border-radius: 50%;
-        width: 40px;
-        height: 40px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        transition: all 0.3s;
-        margin-left: 10px;
-    }
-
-    .btn-toggle-tema:hover {
-        background: var(--avell-red);
-        color: white;
-        transform: rotate(180deg);
-    }
-
-    .invalid-feedback {
-        display: block;
-    }
-
-    .cpf-cnpj-valido {
-        border-color: #28a745 !important;
-        box-shadow: 0 0 0 0.2rem rgba(40, 167, 69, 0.25) !important;
-    }
-
-    .cpf-cnpj-invalido {
-        border-color: #dc3545 !important;
-        box-shadow: 0 0 0 0.2rem rgba(220, 53, 69, 0.25) !important;
-    }
-
-    .email-valido {
-        border-color: #28a745 !important;
-        box-shadow: 0 0 0 0.2rem rgba(40, 167, 69, 0.25) !important;
-    }
-
-    .email-invalido {
-        border-color: #dc3545 !important;
-        box-shadow: 0 0 0 0.2rem rgba(220, 53, 69, 0.25) !important;
-    }
-
-    .telefone-valido {
-        border-color: #28a745 !important;
-        box-shadow: 0 0 0 0.2rem rgba(40, 167, 69, 0.25) !important;
-    }
-
-    .telefone-invalido {
-        border-color: #dc3545 !important;
-        box-shadow: 0 0 0 0.2rem rgba(220, 53, 69, 0.25) !important;
-    }
-
-    .modal-content {
-        background: var(--bg-primary);
-        color: var(--text-primary);
-    }
-
-    .modal-header {
-        border-bottom: 1px solid var(--border-color);
-    }
-
-    .modal-footer {
-        border-top: 1px solid var(--border-color);
-    }
-
-    .ddi-select {
-        max-width: 120px;
-    }
-
-    /* Estilos específicos para tabelas no tema escuro */
-    [data-tema="escuro"] .table {
-        background: var(--bg-primary);
-        color: var(--text-primary);
-        border-color: var(--border-color);
-    }
-
-    [data-tema="escuro"] .table th {
-        background: linear-gradient(135deg, var(--avell-dark) 0%, var(--avell-darker) 100%);
-        color: var(--avell-light);
-        border-color: var(--border-color);
-    }
-
-    [data-tema="escuro"] .table td {
-        background: var(--bg-primary);
-        color: var(--text-primary);
-        border-color: var(--border-color);
-    }
-
-    [data-tema="escuro"] .table-bordered {
-        border: 1px solid var(--border-color);
-    }
-
-    [data-tema="escuro"] .table-bordered th,
-    [data-tema="escuro"] .table-bordered td {
-        border: 1px solid var(--border-color);
-    }
-
-    /* CORREÇÃO: Garantir que textos nos cards sejam visíveis no tema escuro */
-    [data-tema="escuro"] .card-body,
-    [data-tema="escuro"] .card-body div,
-    [data-tema="escuro"] .card-body p,
-    [data-tema="escuro"] .card-body span,
-    [data-tema="escuro"] .card-body strong {
-        color: var(--text-primary) !important;
-    }
-
-    [data-tema="escuro"] .card-body small.text-muted {
-        color: var(--text-secondary) !important;
-    }
-
-    /* Especificamente para os cards de notebook */
-    [data-tema="escuro"] .notebook-card .card-body,
-    [data-tema="escuro"] .notebook-card .card-body div,
-    [data-tema="escuro"] .notebook-card .card-body p {
-        color: var(--text-primary) !important;
-    }
-
-    [data-tema="escuro"] .notebook-card .text-muted {
-        color: #8a8a8a !important;
-    }
-
-    /* Garantir que badges mantenham suas cores */
-    [data-tema="escuro"] .badge {
-        color: white !important;
-    }
-
-    [data-tema="escuro"] .badge.bg-warning {
-        color: black !important;
-    }
-
-    [data-tema="escuro"] .badge.bg-secondary {
-        color: white !important;
-    }
-
-    /* Garantir que textos coloridos sejam visíveis no tema escuro */
-    [data-tema="escuro"] .text-success {
-        color: #28a745 !important;
-    }
-
-    [data-tema="escuro"] .text-info {
-        color: #17a2b8 !important;
-    }
-
-    [data-tema="escuro"] .text-primary {
-        color: #007bff !important;
-    }
-
-    [data-tema="escuro"] .text-warning {
-        color: #ffc107 !important;
-    }
-
-    [data-tema="escuro"] .text-secondary {
-        color: #6c757d !important;
-    }
-
-    [data-tema="escuro"] .text-danger {
-        color: #dc3545 !important;
-    }
-
-    /* Estilo para a barra de progresso no tema escuro */
-    [data-tema="escuro"] .progress {
-        background-color: var(--bg-secondary);
-    }
-
-    [data-tema="escuro"] .progress-bar {
-        background-color: var(--avell-red);
-    }
-
-    /* Estilos para textos de ajuda no tema escuro */
-    [data-tema="escuro"] .form-text {
-        color: #8a8a8a !important;
-    }
-
-    [data-tema="escuro"] .form-control::placeholder {
-        color: #8a8a8a;
-    }
-
-    [data-tema="escuro"] .form-control {
-        color: var(--text-primary);
-    }
-
-    [data-tema="escuro"] .form-control:focus {
-        color: var(--text-primary);
-    }
-
-    [data-tema="escuro"] .form-select {
-        color: var(--text-primary);
-    }
+@app.template_filter('data')
+def filtro_data(valor):
+    """Data no formato brasileiro"""
+    return valor.strftime('%d/%m/%Y')
+
+@app.template_filter('valor')
+def filtro_valor(valor):
+    """Valor monetário com separador de milhar e duas casas"""
+    return f'{valor:,.2f}'
+
+# Assets com o hash do conteúdo (ou a versão da biblioteca) no caminho, gerados na inicialização
+ASSETS = {}
+ASSETS_COMPRIMIVEIS = ('.css', '.js', '.svg', '.ttf')
+ASSETS_CODIFICACOES = (('br', '.br'), ('gzip', '.gz'))
+
+def sufixo_codificacao(nome):
+    """Nome do arquivo sem a extensão de pré-compressão"""
+    for _, extensao in ASSETS_CODIFICACOES:
+        if nome.endswith(extensao):
+            return nome[:-len(extensao)]
+    return nome
+
+def gravar_arquivo(destino, conteudo):
+    """Grava em arquivo temporário e renomeia, para que outro worker nunca leia um arquivo pela metade"""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = f'{destino}.{os.getpid()}.tmp'
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, destino)
+
+def publicar_asset(origem):
+    """Copia o arquivo para a pasta de assets com o hash do conteúdo no nome"""
+    with open(origem, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    
+    nome = os.path.basename(origem)
+    base, extensao = os.path.splitext(nome)
+    publicado = f'{base}.{hashlib.sha256(conteudo).hexdigest()[:12]}{extensao}'
+    
+    pasta = app.config['ASSETS_PASTA']
+    destino = os.path.join(pasta, publicado)
+    if not os.path.exists(destino):
+        gravar_arquivo(destino, conteudo)
+    
+    # Versões anteriores do mesmo arquivo (e suas versões comprimidas) não são mais referenciadas
+    for antigo in os.listdir(pasta):
+        original = sufixo_codificacao(antigo)
+        if original != publicado and original.startswith(base + '.') and original.endswith(extensao) \
+                and len(original) == len(publicado):
+            os.remove(os.path.join(pasta, antigo))
+    
+    ASSETS[nome] = publicado
+    return publicado
+
+def publicar_vendor():
+    """Copia as bibliotecas de static/vendor; a versão no caminho faz o papel do hash"""
+    origem = os.path.join(app.static_folder, 'vendor')
+    destino = os.path.join(app.config['ASSETS_PASTA'], 'vendor')
+    for pasta, _, arquivos in os.walk(origem):
+        for nome in arquivos:
+            caminho = os.path.join(pasta, nome)
+            copia = os.path.join(destino, os.path.relpath(caminho, origem))
+            if not os.path.exists(copia) or os.path.getsize(copia) != os.path.getsize(caminho):
+                with open(caminho, 'rb') as arquivo:
+                    gravar_arquivo(copia, arquivo.read())
+
+def precomprimir(caminho):
+    """Grava as versões .gz e .br (se o brotli estiver instalado) ao lado do arquivo"""
+    with open(caminho, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    
+    compressores = {'.gz': lambda dados: gzip.compress(dados, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressores['.br'] = lambda dados: brotli.compress(dados, quality=11)
+    
+    for extensao, comprimir in compressores.items():
+        destino = caminho + extensao
+        if os.path.exists(destino) and os.path.getmtime(destino) >= os.path.getmtime(caminho):
+            continue
+        gravar_arquivo(destino, comprimir(conteudo))
+
+def gerar_assets():
+    """Publica o CSS e o JS do sistema e as bibliotecas em static/dist, já comprimidos"""
+    publicar_asset(os.path.join(app.static_folder, 'css', 'avell.css'))
+    publicar_asset(os.path.join(app.static_folder, 'js', 'metricas.js'))
+    publicar_asset(os.path.join(app.static_folder, 'js', 'autocompletar.js'))
+    publicar_vendor()
+    
+    for pasta, _, arquivos in os.walk(app.config['ASSETS_PASTA']):
+        for nome in arquivos:
+            if nome.endswith(ASSETS_COMPRIMIVEIS):
+                precomprimir(os.path.join(pasta, nome))
+
+@app.cli.command('gerar-assets')
+def gerar_assets_comando():
+    """Gera os assets publicados e suas versões comprimidas"""
+    gerar_assets()
+    pasta = app.config['ASSETS_PASTA']
+    for raiz, _, arquivos in os.walk(pasta):
+        for nome in sorted(arquivos):
+            if nome.endswith(ASSETS_COMPRIMIVEIS):
+                caminho = os.path.join(raiz, nome)
+                tamanhos = [f'{os.path.getsize(caminho)} B']
+                for codificacao, extensao in ASSETS_CODIFICACOES:
+                    if os.path.exists(caminho + extensao):
+                        tamanhos.append(f'{codificacao} {os.path.getsize(caminho + extensao)} B')
+                print(f"📦 {os.path.relpath(caminho, pasta)}: {', '.join(tamanhos)}")
+    if brotli is None:
+        print("⚠️ brotli não instalado: apenas versões gzip foram geradas")
+
+@app.template_global()
+def asset_url(nome):
+    """URL do asset publicado; o nome muda sempre que o conteúdo muda"""
+    return url_for('asset', nome=ASSETS.get(nome, nome))
+
+@app.route('/assets/<path:nome>')
+def asset(nome):
+    pasta = app.config['ASSETS_PASTA']
+    tipo = mimetypes.guess_type(nome)[0]
+    
+    # Versão pré-comprimida na melhor codificação aceita pelo navegador
+    for codificacao, extensao in ASSETS_CODIFICACOES:
+        if request.accept_encodings[codificacao] and os.path.isfile(os.path.join(pasta, nome + extensao)):
+            resposta = send_from_directory(pasta, nome + extensao, mimetype=tipo, etag=f'{nome}+{codificacao}',
+                                           max_age=app.config['ASSETS_MAX_AGE'])
+            resposta.headers['Content-Encoding'] = codificacao
+            break
+    else:
+        # O nome publicado já contém o hash do conteúdo e serve de ETag
+        resposta = send_from_directory(pasta, nome, mimetype=tipo, etag=nome,
+                                       max_age=app.config['ASSETS_MAX_AGE'])
+    
+    resposta.vary.add('Accept-Encoding')
+    resposta.cache_control.public = True
+    resposta.cache_control.immutable = True
+    return resposta
+
+# Compressão das respostas dinâmicas
+class CompressaoMiddleware:
+    """Comprime as respostas em brotli ou gzip conforme o Accept-Encoding, inclusive as transmitidas em partes"""
+    
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.config = config
+    
+    def __call__(self, environ, start_response):
+        aceitas = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and aceitas['br']:
+            codificacao = 'br'
+        elif aceitas['gzip']:
+            codificacao = 'gzip'
+        else:
+            codificacao = None
+        
+        resposta = {}
+        
+        def capturar(status, headers, exc_info=None):
+            resposta['status'] = status
+            resposta['headers'] = headers
+            return lambda dados: resposta.setdefault('escritos', []).append(dados)
+        
+        corpo = self.wsgi_app(environ, capturar)
+        
+        # Aplicações que só chamam start_response ao iterar o corpo caem direto no gerador
+        if resposta and 'escritos' not in resposta:
+            headers = self.com_vary(resposta['headers'])
+            if not self.deve_comprimir(environ, resposta['status'], headers, codificacao):
+                start_response(resposta['status'], headers)
+                return corpo
+        
+        return self.comprimir(corpo, resposta, codificacao, environ, start_response)
+    
+    def com_vary(self, headers):
+        """Acrescenta Accept-Encoding ao Vary das respostas comprimíveis"""
+        if not self.comprimivel(headers):
+            return headers
+        vary = [valor for nome, valor in headers if nome.lower() == 'vary']
+        if any('accept-encoding' in valor.lower() or valor.strip() == '*' for valor in vary):
+            return headers
+        outros = [(nome, valor) for nome, valor in headers if nome.lower() != 'vary']
+        return outros + [('Vary', ', '.join(vary + ['Accept-Encoding']))]
+    
+    def comprimivel(self, headers):
+        """Tipo de conteúdo que vale comprimir"""
+        tipo = next((valor for nome, valor in headers if nome.lower() == 'content-type'), '')
+        return tipo.split(';')[0].strip().lower() in self.config['COMPRESSAO_TIPOS']
+    
+    def deve_comprimir(self, environ, status, headers, codificacao):
+        if codificacao is None or environ['REQUEST_METHOD'] == 'HEAD':
+            return False
+        if int(status.split(' ', 1)[0]) in (204, 206, 304) or not self.comprimivel(headers):
+            return False
+        
+        cabecalhos = {nome.lower(): valor for nome, valor in headers}
+        if 'content-encoding' in cabecalhos or 'no-transform' in cabecalhos.get('cache-control', ''):
+            return False
+        
+        tamanho = cabecalhos.get('content-length')
+        return tamanho is None or int(tamanho) >= self.config['COMPRESSAO_TAMANHO_MINIMO']
+    
+    def novo_compressor(self, codificacao):
+        """Funções (comprimir, esvaziar, finalizar) do compressor escolhido"""
+        if codificacao == 'br':
+            compressor = brotli.Compressor(quality=self.config['COMPRESSAO_NIVEL_BROTLI'])
+            return compressor.process, compressor.flush, compressor.finish
+        compressor = zlib.compressobj(self.config['COMPRESSAO_NIVEL_GZIP'], zlib.DEFLATED, 31)
+        return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+    
+    def comprimir(self, corpo, resposta, codificacao, environ, start_response):
+        iterador = iter(corpo)
+        try:
+            # Acumula o início do corpo até saber se a resposta passa do tamanho mínimo
+            inicio = list(resposta.pop('escritos', []))
+            tamanho = sum(len(parte) for parte in inicio)
+            terminou = True
+            for parte in iterador:
+                inicio.append(parte)
+                tamanho += len(parte)
+                if tamanho >= self.config['COMPRESSAO_TAMANHO_MINIMO']:
+                    terminou = False
+                    break
+            
+            status = resposta['status']
+            headers = self.com_vary(resposta['headers'])
+            
+            if not self.deve_comprimir(environ, status, headers, codificacao) \
+                    or (terminou and tamanho < self.config['COMPRESSAO_TAMANHO_MINIMO']):
+                start_response(status, headers)
+                yield from inicio
+                yield from iterador
+                return
+            
+            headers = [(nome, valor) for nome, valor in headers if nome.lower() != 'content-length']
+            headers = [(nome, f'W/{valor}' if nome.lower() == 'etag' and not valor.startswith('W/') else valor)
+                       for nome, valor in headers]
+            headers.append(('Content-Encoding', codificacao))
+            start_response(status, headers)
+            
+            processar, esvaziar, finalizar = self.novo_compressor(codificacao)
+            dados = processar(b''.join(inicio))
+            if not terminou:
+                # Cada parte transmitida sai do compressor assim que chega
+                dados += esvaziar()
+                yield dados
+                for parte in iterador:
+                    dados = processar(parte) + esvaziar()
+                    if dados:
+                        yield dados
+                dados = b''
+            yield dados + finalizar()
+        finally:
+            if hasattr(corpo, 'close'):
+                corpo.close()
+
+app.wsgi_app = CompressaoMiddleware(app.wsgi_app, app.config)
+
+def transmitir_template(nome, **contexto):
+    """Renderiza o template aos poucos, enviando a página à medida que o Jinja avança nas linhas"""
+    app.update_template_context(contexto)
+    partes = app.jinja_env.get_template(nome).stream(contexto)
+    partes.enable_buffering(app.config['TEMPLATE_PARTES_POR_BLOCO'])
+    return Response(stream_with_context(partes), mimetype='text/html')
+
+# Cache de fragmentos: cards já renderizados, reaproveitados enquanto o registro não muda
+class CacheFragmentos:
+    """LRU de trechos de HTML limitado pela memória ocupada"""
+    
+    def __init__(self, memoria_maxima):
+        self.memoria_maxima = memoria_maxima
+        self.itens = OrderedDict()
+        self.por_registro = {}
+        self.ocupado = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.trava = threading.Lock()
+    
+    def obter(self, chave):
+        with self.trava:
+            html = self.itens.get(chave)
+            if html is None:
+                self.faltas += 1
+                return None
+            self.itens.move_to_end(chave)
+            self.acertos += 1
+            return html
+    
+    def guardar(self, chave, html):
+        tamanho = sys.getsizeof(html)
+        if tamanho > self.memoria_maxima:
+            return
+        with self.trava:
+            if chave in self.itens:
+                return
+            self.itens[chave] = html
+            self.por_registro.setdefault(chave[:2], set()).add(chave)
+            self.ocupado += tamanho
+            while self.ocupado > self.memoria_maxima:
+                self.remover(next(iter(self.itens)))
+    
+    def invalidar(self, tabela, id):
+        """Descarta todas as versões guardadas de um registro"""
+        with self.trava:
+            for chave in list(self.por_registro.get((tabela, id), ())):
+                self.remover(chave)
+    
+    def remover(self, chave):
+        self.ocupado -= sys.getsizeof(self.itens.pop(chave))
+        chaves = self.por_registro[chave[:2]]
+        chaves.discard(chave)
+        if not chaves:
+            del self.por_registro[chave[:2]]
+
+fragmentos = CacheFragmentos(app.config['FRAGMENTOS_MEMORIA_MAXIMA'])
+FRAGMENTOS = {
+    'notebook': 'partials/card_notebook.html',
+    'comodato': 'partials/card_comodato.html',
+}
+
+@app.template_global()
+def fragmento(registro, **contexto):
+    """Card do registro; só é renderizado de novo quando a versão do registro muda"""
+    tabela = registro.__tablename__
+    chave = (tabela, registro.id, registro.versao, session.get('tema', 'escuro'), *contexto.items())
+    html = fragmentos.obter(chave)
+    if html is None:
+        html = Markup(app.jinja_env.get_template(FRAGMENTOS[tabela]).render({tabela: registro, **contexto}))
+        fragmentos.guardar(chave, html)
+    return html
+
+@event.listens_for(db.session, 'after_flush')
+def anotar_fragmentos_alterados(sessao, contexto):
+    alterados = sessao.info.setdefault('fragmentos_alterados', set())
+    for objeto in chain(sessao.dirty, sessao.deleted):
+        if objeto.__tablename__ in FRAGMENTOS:
+            alterados.add((objeto.__tablename__, objeto.id))
+
+@event.listens_for(db.session, 'after_commit')
+def invalidar_fragmentos(sessao):
+    """Versões antigas dos cards alterados não serão mais pedidas; libera a memória já no commit"""
+    for tabela, id in sessao.info.pop('fragmentos_alterados', ()):
+        fragmentos.invalidar(tabela, id)
+
+@event.listens_for(db.session, 'after_rollback')
+def descartar_fragmentos_alterados(sessao):
+    sessao.info.pop('fragmentos_alterados', None)
+
+# Cache de resultados (KPIs e relatórios), chaveado pelas versões das tabelas de que cada resultado depende
+class CacheMemoria:
+    """Backend local do processo, com TTL e LRU; cada worker do gunicorn tem o seu"""
+    nome = 'memoria'
+    
+    def __init__(self, max_itens):
+        self.max_itens = max_itens
+        self.itens = OrderedDict()
+        self.trava = threading.Lock()
+    
+    def obter(self, chave):
+        with self.trava:
+            item = self.itens.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self.itens[chave]
+                return None
+            self.itens.move_to_end(chave)
+            return valor
+    
+    def guardar(self, chave, valor, ttl):
+        with self.trava:
+            self.itens[chave] = (time.monotonic() + ttl, valor)
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.max_itens:
+                self.itens.popitem(last=False)
+
+class CacheRedis:
+    """Backend compartilhado entre os workers, em qualquer servidor compatível com Redis"""
+    nome = 'redis'
+    
+    def __init__(self, url, prefixo='avell:'):
+        self.cliente = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.prefixo = prefixo
+    
+    def obter(self, chave):
+        try:
+            dados = self.cliente.get(self.prefixo + chave)
+        except redis.RedisError:
+            return None
+        return pickle.loads(dados) if dados is not None else None
+    
+    def guardar(self, chave, valor, ttl):
+        try:
+            self.cliente.set(self.prefixo + chave, pickle.dumps(valor), ex=ttl)
+        except redis.RedisError:
+            pass
+
+class CacheResultados:
+    """Resultados calculados guardados por pouco tempo e descartados quando uma das tabelas muda"""
+    
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.acertos = 0
+        self.faltas = 0
+        # Requisições e o verificador de atrasos contam ao mesmo tempo
+        self.trava = threading.Lock()
+    
+    def obter(self, nome, modelos, calcular, ttl=None):
+        # A chave leva as versões das tabelas lidas do banco, as mesmas das ETags: uma escrita
+        # feita por qualquer worker muda a chave, e a entrada antiga deixa de ser lida
+        versoes = versoes_tabelas(*modelos)
+        chave = nome + ''.join(f'|{getattr(modelo, "__tablename__", modelo)}={versao}'
+                               for modelo, versao in zip(modelos, versoes))
+        valor = self.backend.obter(chave)
+        if valor is not None:
+            with self.trava:
+                self.acertos += 1
+            return valor
+        
+        with self.trava:
+            self.faltas += 1
+        valor = calcular()
+        self.backend.guardar(chave, valor, ttl or self.ttl)
+        return valor
+    
+    def estatisticas(self):
+        with self.trava:
+            acertos, faltas = self.acertos, self.faltas
+        consultas = acertos + faltas
+        return {
+            'backend': self.backend.nome,
+            'acertos': acertos,
+            'faltas': faltas,
+            'taxa_acerto': round(acertos / consultas, 3) if consultas else None,
+        }
+
+def criar_cache_resultados():
+    url = app.config['CACHE_URL']
+    if url and redis is None:
+        print("⚠️ AVELL_CACHE_URL definido mas o pacote redis não está instalado; usando cache em memória")
+    if url and redis is not None:
+        backend = CacheRedis(url)
+    else:
+        backend = CacheMemoria(app.config['CACHE_MAX_ITENS'])
+    return CacheResultados(backend, app.config['CACHE_TTL'])
+
+cache_resultados = criar_cache_resultados()
+
+# ETags das páginas
+@lru_cache(maxsize=None)
+def assinatura_templates():
+    """Hash dos templates e assets publicados; um deploy novo invalida as ETags antigas"""
+    resumo = hashlib.sha1()
+    for pasta, _, arquivos in sorted(os.walk(os.path.join(app.root_path, app.template_folder))):
+        for nome in sorted(arquivos):
+            with open(os.path.join(pasta, nome), 'rb') as arquivo:
+                resumo.update(arquivo.read())
+    resumo.update(repr(sorted(ASSETS.items())).encode())
+    return resumo.hexdigest()
+
+def etag_pagina(pagina, *modelos):
+    """ETag a partir das versões das tabelas lidas pela página, do usuário, do tema e do dia"""
+    partes = [
+        pagina, assinatura_templates(), date.today().isoformat(), session.get('tema', 'escuro'),
+        session.get('usuario_id'), session.get('usuario_nome'), session.get('usuario_email'),
+        *versoes_tabelas(*modelos),
+    ]
+    return hashlib.sha1('|'.join(map(str, partes)).encode()).hexdigest()[:20]
 
-    [data-tema="escuro"] .form-select:focus {
-        color: var(--text-primary);
-    }
+def com_etag(resposta, etag):
+    """Página particular do usuário, que o navegador guarda mas revalida a cada visita"""
+    resposta = make_response(resposta)
+    resposta.set_etag(etag)
+    resposta.cache_control.private = True
+    resposta.cache_control.no_cache = True
+    return resposta
 
-    /* Estilos para exemplos nos campos */
-    .form-text-example {
-        font-size: 0.875em;
-        color: #6c757d;
-        margin-top: 0.25rem;
-        font-style: italic;
-    }
+# Páginas
+def render_login():
+    return render_template('login.html')
 
-    [data-tema="escuro"] .form-text-example {
-        color: #8a8a8a;
-    }
+def render_dashboard(proximas_devolucoes=None):
+    return render_template('dashboard.html',
+                           proximas_devolucoes=proximas_devolucoes or [],
+                           hoje=datetime.now().date())
 
-    /* Estilos para títulos de seção */
-    .section-title {
-        color: var(--avell-red);
-        font-weight: 600;
-        border-bottom: 2px solid var(--avell-red);
-        padding-bottom: 0.5rem;
-        margin-bottom: 1.5rem;
-    }
+def render_clientes(clientes=None, estatisticas=None):
+    return transmitir_template('clientes.html',
+                               clientes=clientes or [],
+                               estatisticas=estatisticas or {'total': 0, 'emprestimos': 0, 'com_email': 0})
 
-    /* CORREÇÃO: Garantir que fontes monospace sejam visíveis */
-    [data-tema="escuro"] .font-monospace {
-        color: var(--text-primary) !important;
-    }
+def render_form_cliente():
+    return render_template('form_cliente.html')
+
+def render_notebooks(inventario=None, estatisticas=None, filtros=None, ordem='recentes', parametros=None):
+    return transmitir_template('notebooks.html',
+                               inventario=inventario or InventarioNotebooks([], 0, False),
+                               estatisticas=estatisticas or {'total': 0, 'disponiveis': 0, 'emprestados': 0, 'valor_total': 0},
+                               filtros=filtros or {},
+                               ordem=ordem,
+                               ordenacoes=ORDENACOES_NOTEBOOKS,
+                               status_notebook=STATUS_NOTEBOOK,
+                               parametros=parametros or {})
+
+def render_emprestimos(emprestimos=None, status='todos', estatisticas=None, proximo=None, anterior=None, limite=None):
+    return transmitir_template('emprestimos.html',
+                               emprestimos=emprestimos or [],
+                               status=status,
+                               estatisticas=estatisticas or {'total': 0, 'ativos': 0, 'atrasados': 0, 'finalizados': 0},
+                               proximo=proximo,
+                               anterior=anterior,
+                               limite=limite)
+
+def render_comodatos(comodatos=None, estatisticas=None):
+    return transmitir_template('comodatos.html',
+                               comodatos=comodatos or [],
+                               estatisticas=estatisticas or {'total': 0, 'unidades': 0, 'valor_total': 0})
 
-    /* CORREÇÃO: Garantir que textos em listas sejam visíveis */
-    [data-tema="escuro"] .list-group-item {
-        background-color: var(--bg-primary);
-        color: var(--text-primary);
-        border-color: var(--border-color);
-    }
+def render_form_comodato():
+    return render_template('form_comodato.html')
 
-    [data-tema="escuro"] .list-group-item h6 {
-        color: var(--text-primary) !important;
-    }
+def render_relatorios():
+    return render_template('relatorios.html', agora=datetime.now(), exportar_parquet=pyarrow is not None)
 
-    /* CORREÇÃO: Garantir que valores em destaque sejam visíveis */
-    [data-tema="escuro"] .valor-destaque {
-        color: var(--avell-red) !important;
-    }
+def render_importar(tipo='clientes', resultado=None):
+    return render_template('importar.html', tipo=tipo, resultado=resultado,
+                           colunas=IMPORTACOES[tipo][3], tipos=list(IMPORTACOES),
+                           erros_exibidos=app.config['IMPORTACAO_ERROS_EXIBIDOS'])
 
-    /* CORREÇÃO: Garantir que textos de status sejam visíveis */
-    [data-tema="escuro"] .text-success,
-    [data-tema="escuro"] .text-danger,
-    [data-tema="escuro"] .text-warning {
-        opacity: 1 !important;
-    }
-</style>
-'''
+def render_busca(termo='', tipo=None, resultado=None, duracao=0, indisponivel=False):
+    return render_template('busca.html', termo=termo, tipo=tipo, resultado=resultado or ResultadoBusca(),
+                           fontes=BUSCA_FONTES, duracao=duracao, indisponivel=indisponivel)
 
-# Template Base - CORRIGIDO SIMPLES
-def render_base(content, active_page='dashboard'):
-    tema_atual = session.get('tema', 'escuro')
-    
-    # Links da sidebar
-    links = [
-        {'url': '/dashboard', 'icon': 'fa-tachometer-alt', 'text': 'Dashboard', 'page': 'dashboard'},
-        {'url': '/clientes', 'icon': 'fa-users', 'text': 'Clientes', 'page': 'clientes'},
-        {'url': '/notebooks', 'icon': 'fa-laptop', 'text': 'Notebooks', 'page': 'notebooks'},
-        {'url': '/emprestimos', 'icon': 'fa-exchange-alt', 'text': 'Empréstimos', 'page': 'emprestimos'},
-        {'url': '/comodatos', 'icon': 'fa-file-contract', 'text': 'Comodatos', 'page': 'comodatos'},
-        {'url': '/relatorios', 'icon': 'fa-chart-bar', 'text': 'Relatórios', 'page': 'relatorios'},
-    ]
-    
-    # Adicionar link de usuários apenas para admin
-    if session.get('usuario_email') == 'admin':
-        links.append({'url': '/usuarios', 'icon': 'fa-user-shield', 'text': 'Gerenciar Usuários', 'page': 'usuarios'})
-    
-    # Gerar HTML dos links
-    sidebar_links = ''
-    for link in links:
-        is_active = 'active' if active_page == link['page'] else ''
-        sidebar_links += f'''
-        <a href="{link['url']}" class="sidebar-link {is_active}">
-            <i class="fas {link['icon']} me-2"></i> {link['text']}
-        </a>
-        '''
-    
-    return f'''
-<!DOCTYPE html>
-<html lang="pt-BR" data-tema="{tema_atual}">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Sistema Avell - Empréstimos</title>
-    <link rel="icon" type="image/png" href="/static/avell.png">
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-    {CSS_GLOBAL}
-</head>
-<body>
-    <nav class="navbar navbar-expand-lg navbar-dark avell-navbar">
-        <div class="container-fluid">
-            <a class="navbar-brand d-flex align-items-center" href="/dashboard">
-                <img src="/static/avell.png" alt="Avell Logo" height="32" class="me-2">
-                Sistema Avell
-            </a>
-            <div class="navbar-nav ms-auto">
-                <form method="POST" action="/toggle-tema" class="d-inline">
-                    <button type="submit" class="btn-toggle-tema" title="Alternar tema">
-                        <i class="fas fa-{'sun' if tema_atual == 'escuro' else 'moon'}"></i>
-                    </button>
-                </form>
-                <div class="nav-item dropdown">
-                    <a class="nav-link dropdown-toggle" href="#" role="button" data-bs-toggle="dropdown">
-                        <i class="fas fa-user me-1"></i> {session.get('usuario_nome', 'Usuário')}
-                    </a>
-                    <ul class="dropdown-menu">
-                        <li><a class="dropdown-item" href="/logout"><i class="fas fa-sign-out-alt me-2"></i> Sair</a></li>
-                    </ul>
-                </div>
-            </div>
-        </div>
-    </nav>
-
-    <div class="container-fluid">
-        <div class="row">
-            <nav class="col-md-2 d-none d-md-block sidebar">
-                <div class="sidebar-sticky">
-                    {sidebar_links}
-                </div>
-            </nav>
-
-            <main class="col-md-10 ms-sm-auto px-4 main-content">
-                {content}
-            </main>
-        </div>
-    </div>
-
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-</body>
-</html>
-'''
-
-# Template Login - ATUALIZADO
-def render_login():
-    tema_atual = session.get('tema', 'escuro')
-    return f'''
-<!DOCTYPE html>
-<html lang="pt-BR" data-tema="{tema_atual}">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Login - Sistema Avell</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-    {CSS_GLOBAL}
-</head>
-<body class="login-body">
-    <div class="login-container">
-        <div class="login-logo">
-            <i class="fas fa-laptop-code fa-3x mb-3"></i>
-            <h2>Sistema Avell</h2>
-            <p class="text-muted">Gestão de Empréstimos</p>
-        </div>
-
-        <form method="POST" action="/login">
-            <div class="mb-3">
-                <label class="form-label">Email</label>
-                <div class="input-group">
-                    <span class="input-group-text"><i class="fas fa-user"></i></span>
-                    <input type="text" name="email" class="form-control" placeholder="Digite seu email" required>
-                </div>
-            </div>
-            
-            <div class="mb-3">
-                <label class="form-label">Senha</label>
-                <div class="input-group">
-                    <span class="input-group-text"><i class="fas fa-lock"></i></span>
-                    <input type="password" name="senha" class="form-control" placeholder="Digite sua senha" required>
-                </div>
-            </div>
-
-            <button type="submit" class="btn btn-avell w-100 py-2">
-                <i class="fas fa-sign-in-alt me-2"></i>Entrar no Sistema
-            </button>
-        </form>
-
-        <div class="mt-4 text-center">
-            <p class="text-muted">Sistema exclusivo para funcionários autorizados</p>
-        </div>
-    </div>
-
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-</body>
-</html>
-'''
-
-# Template Dashboard
-def render_dashboard(total_clientes=0, total_notebooks=0, emprestimos_ativos=0, emprestimos_atrasados=0, proximas_devolucoes=None, total_comodatos=0, valor_total_comodatos=0):
-    if proximas_devolucoes is None:
-        proximas_devolucoes = []
-    
-    devolucoes_html = ''
-    for emp in proximas_devolucoes:
-        dias_restantes = (emp.data_devolucao_prevista.date() - datetime.now().date()).days
-        status_cor = 'text-danger' if dias_restantes < 0 else 'text-muted'
-        texto_dias = f'{dias_restantes} dias atrás' if dias_restantes < 0 else f'{dias_restantes} dias'
-        
-        devolucoes_html += f'''
-        <div class="list-group-item">
-            <div class="d-flex w-100 justify-content-between">
-                <h6 class="mb-1">{emp.cliente.nome}</h6>
-                <small class="{status_cor}">{texto_dias}</small>
-            </div>
-            <p class="mb-1 small">{emp.notebook.modelo}</p>
-            <small class="text-muted">Devolução: {emp.data_devolucao_prevista.strftime('%d/%m/%Y')}</small>
-        </div>
-        '''
-    
-    content = f'''
-    <div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
-        <h1 class="h2">Dashboard</h1>
-        <div class="btn-toolbar mb-2 mb-md-0">
-            <a href="/emprestimos/novo" class="btn btn-avell me-2">
-                <i class="fas fa-plus me-1"></i> Novo Empréstimo
-            </a>
-        </div>
-    </div>
-
-    <!-- Stats Cards -->
-    <div class="row">
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{total_notebooks}</div>
-                <div class="stats-label">Notebooks Cadastrados</div>
-            </div>
-        </div>
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{emprestimos_ativos}</div>
-                <div class="stats-label">Empréstimos Ativos</div>
-            </div>
-        </div>
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{total_clientes}</div>
-                <div class="stats-label">Total de Clientes</div>
-            </div>
-        </div>
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{total_comodatos}</div>
-                <div class="stats-label">Contratos Comodato</div>
-            </div>
-        </div>
-    </div>
-
-    <div class="row mt-4">
-        <div class="col-md-8">
-            <div class="card">
-                <div class="card-header">
-                    <i class="fas fa-chart-line me-2"></i> Empréstimos - Últimos 6 Meses
-                </div>
-                <div class="card-body">
-                    <canvas id="graficoEmprestimos" height="100"></canvas>
-                </div>
-            </div>
-        </div>
-        
-        <div class="col-md-4">
-            {f'<div class="card mb-4"><div class="card-header"><i class="fas fa-clock me-2"></i> Próximas Devoluções</div><div class="card-body p-0"><div class="list-group list-group-flush">' + devolucoes_html + '</div></div></div>' if proximas_devolucoes else ''}
-            
-            <div class="card">
-                <div class="card-header">
-                    <i class="fas fa-info-circle me-2"></i> Sistema Avell
-                </div>
-                <div class="card-body">
-                    <div class="mb-3">
-                        <strong>Status:</strong>
-                        {'<span class="badge bg-warning">Configuração Inicial</span><p class="small text-muted mt-1">Comece cadastrando clientes e notebooks</p>' if total_clientes == 0 and total_notebooks == 0 else '<span class="badge bg-success">Operacional</span>'}
-                    </div>
-                    
-                    <div class="mb-3">
-                        <strong>Valor Total em Comodatos:</strong>
-                        <div class="valor-destaque">R$ {valor_total_comodatos:,.2f}</div>
-                    </div>
-                    
-                    <div class="d-grid gap-2">
-                        <a href="/clientes/novo" class="btn btn-avell btn-sm">
-                            <i class="fas fa-user-plus me-1"></i> Novo Cliente
-                        </a>
-                        <a href="/notebooks/novo" class="btn btn-outline-secondary btn-sm">
-                            <i class="fas fa-laptop me-1"></i> Cadastrar Notebook
-                        </a>
-                        <a href="/comodatos/novo" class="btn btn-outline-primary btn-sm">
-                            <i class="fas fa-file-contract me-1"></i> Novo Comodato
-                        </a>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        document.addEventListener('DOMContentLoaded', function() {{
-            const data = {{
-                labels: ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun'],
-                datasets: [{{
-                    label: 'Empréstimos',
-                    data: [12, 15, 8, 11, 14, 10],
-                    backgroundColor: '#e30613'
-                }}]
-            }};
-            
-            const ctx = document.getElementById('graficoEmprestimos').getContext('2d');
-            new Chart(ctx, {{
-                type: 'bar',
-                data: data,
-                options: {{
-                    responsive: true,
-                    plugins: {{
-                        legend: {{ display: false }}
-                    }}
-                }}
-            }});
-        }});
-    </script>
-    '''
-    
-    return render_base(content, 'dashboard')
-
-# Template Clientes
-def render_clientes(clientes=None):
-    if clientes is None:
-        clientes = []
-    
-    clientes_html = ''
-    for cliente in clientes:
-        clientes_html += f'''
-        <tr>
-            <td><strong>{cliente.nome}</strong></td>
-            <td>{cliente.cpf_cnpj}</td>
-            <td>{cliente.telefone or 'Não informado'}</td>
-            <td>{cliente.email or 'Não informado'}</td>
-            <td>{cliente.data_cadastro.strftime('%d/%m/%Y')}</td>
-            <td><span class="badge bg-primary">{len(cliente.emprestimos)}</span></td>
-        </tr>
-        '''
-    
-    content = f'''
-    <div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
-        <h1 class="h2">Clientes</h1>
-        <div class="btn-toolbar mb-2 mb-md-0">
-            <a href="/clientes/novo" class="btn btn-avell">
-                <i class="fas fa-plus me-1"></i> Novo Cliente
-            </a>
-        </div>
-    </div>
-
-    <div class="card">
-        <div class="card-header">
-            <i class="fas fa-users me-2"></i> Lista de Clientes
-        </div>
-        <div class="card-body">
-            {'<div class="table-responsive"><table class="table table-striped table-hover"><thead><tr><th>Nome</th><th>CPF/CNPJ</th><th>Telefone</th><th>Email</th><th>Data Cadastro</th><th>Empréstimos</th></tr></thead><tbody>' + clientes_html + '</tbody></table></div>' if clientes else '<div class="text-center py-5"><i class="fas fa-users fa-3x text-muted mb-3"></i><h5 class="text-muted">Nenhum cliente cadastrado</h5><a href="/clientes/novo" class="btn btn-avell mt-2"><i class="fas fa-plus me-1"></i> Cadastrar Primeiro Cliente</a></div>'}
-        </div>
-    </div>
-
-    <!-- Estatísticas -->
-    <div class="row mt-4">
-        <div class="col-md-4">
-            <div class="card stats-card">
-                <div class="stats-number">{len(clientes)}</div>
-                <div class="stats-label">Total de Clientes</div>
-            </div>
-        </div>
-        <div class="col-md-4">
-            <div class="card stats-card">
-                <div class="stats-number">{sum(len(cliente.emprestimos) for cliente in clientes)}</div>
-                <div class="stats-label">Total de Empréstimos</div>
-            </div>
-        </div>
-        <div class="col-md-4">
-            <div class="card stats-card">
-                <div class="stats-number">{len([c for c in clientes if c.email])}</div>
-                <div class="stats-label">Com Email</div>
-            </div>
-        </div>
-    </div>
-    '''
-    
-    return render_base(content, 'clientes')
-
-# Template Form Cliente - ATUALIZADO COM EXEMPLOS NOS CAMPOS
-def render_form_cliente():
-    content = f'''
-    <div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
-        <h1 class="h2">Novo Cliente</h1>
-        <div class="btn-toolbar mb-2 mb-md-0">
-            <a href="/clientes" class="btn btn-outline-secondary">
-                <i class="fas fa-arrow-left me-1"></i> Voltar
-            </a>
-        </div>
-    </div>
-
-    <div class="card">
-        <div class="card-header">
-            <i class="fas fa-user-plus me-2"></i> Dados do Cliente
-        </div>
-        <div class="card-body">
-            <form method="POST" id="formCliente" class="needs-validation" novalidate>
-                <div class="row">
-                    <div class="col-md-8 mb-3">
-                        <label for="nome" class="form-label">Nome Completo *</label>
-                        <input type="text" class="form-control" id="nome" name="nome" 
-                               placeholder="Ex: João Silva Santos" required>
-                    </div>
-                    
-                    <div class="col-md-4 mb-3">
-                        <label for="cpf_cnpj" class="form-label">CPF/CNPJ *</label>
-                        <input type="text" class="form-control" id="cpf_cnpj" name="cpf_cnpj" 
-                               placeholder="000.000.000-00 ou 00.000.000/0000-00" required>
-                        <div class="valid-feedback">
-                            CPF/CNPJ válido!
-                        </div>
-                    </div>
-                </div>
-                
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="telefone" class="form-label">Telefone</label>
-                        <div class="input-group">
-                            <select class="form-select ddi-select" id="ddi" name="ddi">
-                                <option value="+55">+55 (BR)</option>
-                                <option value="+1">+1 (EUA)</option>
-                                <option value="+54">+54 (ARG)</option>
-                                <option value="+56">+56 (CHL)</option>
-                                <option value="+598">+598 (URU)</option>
-                                <option value="+595">+595 (PAR)</option>
-                                <option value="+51">+51 (PER)</option>
-                                <option value="+57">+57 (COL)</option>
-                                <option value="+52">+52 (MEX)</option>
-                            </select>
-                            <input type="text" class="form-control" id="telefone" name="telefone" placeholder="(11) 99999-9999">
-                        </div>
-                        <div class="valid-feedback">
-                            Telefone válido!
-                        </div>
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="email" class="form-label">Email</label>
-                        <input type="email" class="form-control" id="email" name="email" placeholder="exemplo@dominio.com">
-                        <div class="valid-feedback">
-                            Email válido!
-                        </div>
-                    </div>
-                </div>
-                
-                <div class="mb-3">
-                    <label for="endereco" class="form-label">Endereço</label>
-                    <textarea class="form-control" id="endereco" name="endereco" rows="3" 
-                              placeholder="Ex: Rua das Flores, 123 - Centro - São Paulo/SP"></textarea>
-                </div>
-                
-                <div class="d-grid gap-2 d-md-flex justify-content-md-end">
-                    <a href="/clientes" class="btn btn-secondary me-md-2">Cancelar</a>
-                    <button type="submit" class="btn btn-avell" id="btnSubmit">Cadastrar Cliente</button>
-                </div>
-            </form>
-        </div>
-    </div>
-
-    <script>
-        document.addEventListener('DOMContentLoaded', function() {{
-            const cpfCnpjInput = document.getElementById('cpf_cnpj');
-            const emailInput = document.getElementById('email');
-            const telefoneInput = document.getElementById('telefone');
-            const ddiSelect = document.getElementById('ddi');
-            const form = document.getElementById('formCliente');
-            const btnSubmit = document.getElementById('btnSubmit');
-            
-            // Função para formatar CPF/CNPJ
-            function formatarCPFCNPJ(valor) {{
-                const numeros = valor.replace(/\\D/g, '');
-                
-                if (numeros.length <= 11) {{
-                    return numeros.replace(/(\\d{{3}})(\\d)/, '$1.$2')
-                                 .replace(/(\\d{{3}})(\\d)/, '$1.$2')
-                                 .replace(/(\\d{{3}})(\\d{{1,2}})$/, '$1-$2');
-                }} else {{
-                    return numeros.replace(/^(\\d{{2}})(\\d)/, '$1.$2')
-                                 .replace(/^(\\d{{2}})\\.(\\d{{3}})(\\d)/, '$1.$2.$3')
-                                 .replace(/\\.(\\d{{3}})(\\d)/, '.$1/$2')
-                                 .replace(/(\\d{{4}})(\\d)/, '$1-$2');
-                }}
-            }}
-            
-            // Função para validar CPF/CNPJ
-            function validarCPFCNPJ(valor) {{
-                const numeros = valor.replace(/\\D/g, '');
-                
-                if (numeros.length === 11) {{
-                    return validarCPF(numeros);
-                }} else if (numeros.length === 14) {{
-                    return validarCNPJ(numeros);
-                }}
-                return false;
-            }}
-            
-            // Função para validar CPF
-            function validarCPF(cpf) {{
-                if (cpf.length !== 11 || /^(\\d)\\1{{10}}$/.test(cpf)) return false;
-                
-                let soma = 0;
-                for (let i = 0; i < 9; i++) {{
-                    soma += parseInt(cpf.charAt(i)) * (10 - i);
-                }}
-                let resto = soma % 11;
-                let digito1 = resto < 2 ? 0 : 11 - resto;
-                
-                if (digito1 !== parseInt(cpf.charAt(9))) return false;
-                
-                soma = 0;
-                for (let i = 0; i < 10; i++) {{
-                    soma += parseInt(cpf.charAt(i)) * (11 - i);
-                }}
-                resto = soma % 11;
-                let digito2 = resto < 2 ? 0 : 11 - resto;
-                
-                return digito2 === parseInt(cpf.charAt(10));
-            }}
-            
-            // Função para validar CNPJ
-            function validarCNPJ(cnpj) {{
-                if (cnpj.length !== 14 || /^(\\d)\\1{{13}}$/.test(cnpj)) return false;
-                
-                let tamanho = cnpj.length - 2;
-                let numeros = cnpj.substring(0, tamanho);
-                let digitos = cnpj.substring(tamanho);
-                let soma = 0;
-                let pos = tamanho - 7;
-                
-                for (let i = tamanho; i >= 1; i--) {{
-                    soma += numeros.charAt(tamanho - i) * pos--;
-                    if (pos < 2) pos = 9;
-                }}
-                
-                let resultado = soma % 11 < 2 ? 0 : 11 - soma % 11;
-                if (resultado !== parseInt(digitos.charAt(0))) return false;
-                
-                tamanho = tamanho + 1;
-                numeros = cnpj.substring(0, tamanho);
-                soma = 0;
-                pos = tamanho - 7;
-                
-                for (let i = tamanho; i >= 1; i--) {{
-                    soma += numeros.charAt(tamanho - i) * pos--;
-                    if (pos < 2) pos = 9;
-                }}
-                
-                resultado = soma % 11 < 2 ? 0 : 11 - soma % 11;
-                return resultado === parseInt(digitos.charAt(1));
-            }}
-            
-            // Função para formatar telefone baseado no DDI
-            function formatarTelefone(valor, ddi) {{
-                const numeros = valor.replace(/\\D/g, '');
-                
-                if (ddi === '+55') {{
-                    // Formatação brasileira: (11) 99999-9999
-                    if (numeros.length <= 10) {{
-                        return numeros.replace(/(\\d{{2}})(\\d)/, '($1) $2')
-                                     .replace(/(\\d{{4}})(\\d)/, '$1-$2');
-                    }} else {{
-                        return numeros.replace(/(\\d{{2}})(\\d)/, '($1) $2')
-                                     .replace(/(\\d{{5}})(\\d)/, '$1-$2');
-                    }}
-                }} else {{
-                    // Formatação internacional simples
-                    return numeros.replace(/(\\d{{3}})(\\d)/, '$1 $2')
-                                 .replace(/(\\d{{3}})(\\d)/, '$1 $2')
-                                 .replace(/(\\d{{4}})$/, '$1');
-                }}
-            }}
-            
-            // Função para validar email
-            function validarEmail(email) {{
-                if (!email) return true; // Email é opcional
-                const regex = /^[^\\s@]+@[^\\s@]+\\.[^\\s@]+$/;
-                return regex.test(email) && email.includes('@') && email.split('@')[1].includes('.');
-            }}
-            
-            // Função para validar telefone
-            function validarTelefone(telefone) {{
-                if (!telefone) return true; // Telefone é opcional
-                const numeros = telefone.replace(/\\D/g, '');
-                return numeros.length >= 10;
-            }}
-            
-            // Event listener para CPF/CNPJ
-            cpfCnpjInput.addEventListener('input', function(e) {{
-                const valor = e.target.value;
-                const valorFormatado = formatarCPFCNPJ(valor);
-                
-                if (valorFormatado !== valor) {{
-                    e.target.value = valorFormatado;
-                }}
-                
-                const isValid = validarCPFCNPJ(valorFormatado);
-                
-                if (valorFormatado && !isValid) {{
-                    e.target.classList.add('cpf-cnpj-invalido');
-                    e.target.classList.remove('cpf-cnpj-valido');
-                    e.target.classList.add('is-invalid');
-                    e.target.classList.remove('is-valid');
-                }} else if (valorFormatado && isValid) {{
-                    e.target.classList.add('cpf-cnpj-valido');
-                    e.target.classList.remove('cpf-cnpj-invalido');
-                    e.target.classList.add('is-valid');
-                    e.target.classList.remove('is-invalid');
-                }} else {{
-                    e.target.classList.remove('cpf-cnpj-valido', 'cpf-cnpj-invalido', 'is-valid', 'is-invalid');
-                }}
-                
-                validarFormulario();
-            }});
-            
-            // Event listener para email
-            emailInput.addEventListener('input', function(e) {{
-                const valor = e.target.value;
-                const isValid = validarEmail(valor);
-                
-                if (valor && !isValid) {{
-                    e.target.classList.add('email-invalido');
-                    e.target.classList.remove('email-valido');
-                    e.target.classList.add('is-invalid');
-                    e.target.classList.remove('is-valid');
-                }} else if (valor && isValid) {{
-                    e.target.classList.add('email-valido');
-                    e.target.classList.remove('email-invalido');
-                    e.target.classList.add('is-valid');
-                    e.target.classList.remove('is-invalid');
-                }} else {{
-                    e.target.classList.remove('email-valido', 'email-invalido', 'is-valid', 'is-invalid');
-                }}
-                
-                validarFormulario();
-            }});
-            
-            // Event listener para telefone
-            telefoneInput.addEventListener('input', function(e) {{
-                const valor = e.target.value;
-                const ddi = ddiSelect.value;
-                const valorFormatado = formatarTelefone(valor, ddi);
-                
-                if (valorFormatado !== valor) {{
-                    e.target.value = valorFormatado;
-                }}
-                
-                const isValid = validarTelefone(valorFormatado);
-                
-                if (valor && !isValid) {{
-                    e.target.classList.add('telefone-invalido');
-                    e.target.classList.remove('telefone-valido');
-                    e.target.classList.add('is-invalid');
-                    e.target.classList.remove('is-valid');
-                }} else if (valor && isValid) {{
-                    e.target.classList.add('telefone-valido');
-                    e.target.classList.remove('telefone-invalido');
-                    e.target.classList.add('is-valid');
-                    e.target.classList.remove('is-invalid');
-                }} else {{
-                    e.target.classList.remove('telefone-valido', 'telefone-invalido', 'is-valid', 'is-invalid');
-                }}
-                
-                validarFormulario();
-            }});
-            
-            // Event listener para DDI
-            ddiSelect.addEventListener('change', function() {{
-                const telefone = telefoneInput.value;
-                if (telefone) {{
-                    const ddi = this.value;
-                    const valorFormatado = formatarTelefone(telefone.replace(/\\D/g, ''), ddi);
-                    telefoneInput.value = valorFormatado;
-                }}
-            }});
-            
-            // Função para validar todo o formulário
-            function validarFormulario() {{
-                const nome = document.getElementById('nome').value;
-                const cpfCnpj = cpfCnpjInput.value;
-                const email = emailInput.value;
-                const telefone = telefoneInput.value;
-                
-                const nomeValido = nome.trim() !== '';
-                const cpfCnpjValido = validarCPFCNPJ(cpfCnpj);
-                const emailValido = validarEmail(email);
-                const telefoneValido = validarTelefone(telefone);
-                
-                btnSubmit.disabled = !(nomeValido && cpfCnpjValido && emailValido && telefoneValido);
-            }}
-            
-            // Validação no submit
-            form.addEventListener('submit', function(e) {{
-                const nome = document.getElementById('nome').value;
-                const cpfCnpjValue = cpfCnpjInput.value;
-                const emailValue = emailInput.value;
-                const telefoneValue = telefoneInput.value;
-                
-                let isValid = true;
-                
-                // Validar nome
-                if (!nome.trim()) {{
-                    document.getElementById('nome').classList.add('is-invalid');
-                    isValid = false;
-                }}
-                
-                // Validar CPF/CNPJ
-                if (!validarCPFCNPJ(cpfCnpjValue)) {{
-                    cpfCnpjInput.classList.add('is-invalid');
-                    isValid = false;
-                }}
-                
-                // Validar email
-                if (emailValue && !validarEmail(emailValue)) {{
-                    emailInput.classList.add('is-invalid');
-                    isValid = false;
-                }}
-                
-                // Validar telefone
-                if (telefoneValue && !validarTelefone(telefoneValue)) {{
-                    telefoneInput.classList.add('is-invalid');
-                    isValid = false;
-                }}
-                
-                if (!isValid) {{
-                    e.preventDefault();
-                    alert('Por favor, corrija os campos destacados em vermelho antes de enviar o formulário.');
-                }}
-            }});
-            
-            // Validação inicial
-            validarFormulario();
-            
-            // Focar no campo de nome ao carregar a página
-            document.getElementById('nome').focus();
-        }});
-    </script>
-    '''
-    
-    return render_base(content, 'clientes')
-
-# Template Notebooks
-def render_notebooks(notebooks=None):
-    if notebooks is None:
-        notebooks = []
-    
-    notebooks_html = ''
-    for notebook in notebooks:
-        status_badge = f'<span class="badge badge-{notebook.status}">{notebook.status.title()}</span>'
-        valor_str = f'R$ {notebook.valor:,.2f}' if notebook.valor else 'Não informado'
-        notebooks_html += f'''
-        <div class="col-md-6 col-lg-4 mb-4">
-            <div class="card notebook-card h-100">
-                <div class="card-header d-flex justify-content-between align-items-center">
-                    <span class="fw-bold">{notebook.modelo}</span>
-                    {status_badge}
-                </div>
-                <div class="card-body">
-                    <div class="mb-2">
-                        <small class="text-muted">Processador:</small>
-                        <div>{notebook.processador or 'Não informado'}</div>
-                    </div>
-                    
-                    <div class="mb-2">
-                        <small class="text-muted">Placa de Vídeo:</small>
-                        <div>{notebook.placa_video or 'Não informado'}</div>
-                    </div>
-                    
-                    <div class="row mb-2">
-                        <div class="col-6">
-                            <small class="text-muted">RAM:</small>
-                            <div>{notebook.memoria_ram or 'Não informado'}</div>
-                        </div>
-                        <div class="col-6">
-                            <small class="text-muted">Armazenamento:</small>
-                            <div>{notebook.armazenamento or 'Não informado'}</div>
-                        </div>
-                    </div>
-                    
-                    <div class="mb-2">
-                        <small class="text-muted">Nº Série:</small>
-                        <div class="font-monospace small">{notebook.numero_serie}</div>
-                    </div>
-                    
-                    <div class="mb-2">
-                        <small class="text-muted">Valor:</small>
-                        <div class="fw-bold text-success">{valor_str}</div>
-                    </div>
-                    
-                    <div class="mb-3">
-                        <small class="text-muted">Histórico:</small>
-                        <div>
-                            <span class="badge bg-secondary">{len(notebook.emprestimos)} empréstimos</span>
-                        </div>
-                    </div>
-                </div>
-                <div class="card-footer bg-transparent">
-                    <small class="text-{'success' if notebook.status == 'disponivel' else 'danger' if notebook.status == 'emprestado' else 'warning'}">
-                        <i class="fas fa-{'check-circle' if notebook.status == 'disponivel' else 'exclamation-circle' if notebook.status == 'emprestado' else 'tools'} me-1"></i>
-                        {notebook.status.title()}
-                    </small>
-                </div>
-            </div>
-        </div>
-        '''
-    
-    # Estatísticas
-    total = len(notebooks)
-    disponiveis = len([n for n in notebooks if n.status == 'disponivel'])
-    emprestados = len([n for n in notebooks if n.status == 'emprestado'])
-    manutencao = len([n for n in notebooks if n.status == 'manutencao'])
-    valor_total = sum(n.valor or 0 for n in notebooks)
-    
-    content = f'''
-    <div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
-        <h1 class="h2">Notebooks</h1>
-        <div class="btn-toolbar mb-2 mb-md-0">
-            <a href="/notebooks/novo" class="btn btn-avell">
-                <i class="fas fa-plus me-1"></i> Novo Notebook
-            </a>
-        </div>
-    </div>
-
-    <!-- Estatísticas -->
-    <div class="row">
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{total}</div>
-                <div class="stats-label">Total de Notebooks</div>
-            </div>
-        </div>
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{disponiveis}</div>
-                <div class="stats-label">Disponíveis</div>
-            </div>
-        </div>
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{emprestados}</div>
-                <div class="stats-label">Emprestados</div>
-            </div>
-        </div>
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">R$ {valor_total:,.2f}</div>
-                <div class="stats-label">Valor Total</div>
-            </div>
-        </div>
-    </div>
-
-    <div class="row mt-4">
-        {notebooks_html if notebooks else '<div class="col-12"><div class="card"><div class="card-body text-center py-5"><i class="fas fa-laptop fa-3x text-muted mb-3"></i><h5 class="text-muted">Nenhum notebook cadastrado</h5><a href="/notebooks/novo" class="btn btn-avell"><i class="fas fa-plus me-1"></i> Cadastrar Notebook</a></div></div></div>'}
-    </div>
-    '''
-    
-    return render_base(content, 'notebooks')
-
-# Template Empréstimos
-def render_emprestimos(emprestimos=None, status='todos'):
-    if emprestimos is None:
-        emprestimos = []
-    
-    emprestimos_html = ''
-    for emp in emprestimos:
-        if emp.status == 'ativo':
-            if emp.data_devolucao_prevista < datetime.now():
-                status_badge = '<span class="badge badge-atrasado">Atrasado</span>'
-            else:
-                status_badge = '<span class="badge badge-ativo">Ativo</span>'
-            acoes = f'''
-            <form method="POST" action="/emprestimos/{emp.id}/devolver" class="d-inline">
-                <button type="submit" class="btn btn-success btn-sm" onclick="return confirm('Confirmar devolução do notebook?')">
-                    <i class="fas fa-check"></i> Devolver
-                </button>
-            </form>
-            '''
-        else:
-            status_badge = '<span class="badge badge-finalizado">Finalizado</span>'
-            acoes = '<span class="text-muted">Finalizado</span>'
-        
-        emprestimos_html += f'''
-        <tr>
-            <td>
-                <strong>{emp.cliente.nome}</strong>
-                <br><small class="text-muted">{emp.cliente.cpf_cnpj}</small>
-            </td>
-            <td>
-                {emp.notebook.modelo}
-                <br><small class="text-muted">{emp.notebook.numero_serie}</small>
-            </td>
-            <td>{emp.data_emprestimo.strftime('%d/%m/%Y')}</td>
-            <td>
-                {emp.data_devolucao_prevista.strftime('%d/%m/%Y')}
-                {('<br><small class="text-danger">Atrasado</small>' if emp.status == 'ativo' and emp.data_devolucao_prevista < datetime.now() else '')}
-            </td>
-            <td>{status_badge}</td>
-            <td>{emp.usuario.nome}</td>
-            <td>{acoes}</td>
-        </tr>
-        '''
-    
-    # Filtros
-    filtros_html = f'''
-    <div class="btn-group mb-3" role="group">
-        <a href="/emprestimos?status=todos" class="btn btn-outline-secondary {'active' if status == 'todos' else ''}">Todos</a>
-        <a href="/emprestimos?status=ativos" class="btn btn-outline-secondary {'active' if status == 'ativos' else ''}">Ativos</a>
-        <a href="/emprestimos?status=atrasados" class="btn btn-outline-secondary {'active' if status == 'atrasados' else ''}">Atrasados</a>
-        <a href="/emprestimos?status=finalizados" class="btn btn-outline-secondary {'active' if status == 'finalizados' else ''}">Finalizados</a>
-    </div>
-    '''
-    
-    # Estatísticas
-    ativos = len([e for e in emprestimos if e.status == 'ativo'])
-    atrasados = len([e for e in emprestimos if e.status == 'ativo' and e.data_devolucao_prevista < datetime.now()])
-    finalizados = len([e for e in emprestimos if e.status == 'finalizado'])
-    
-    content = f'''
-    <div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
-        <h1 class="h2">Empréstimos</h1>
-        <div class="btn-toolbar mb-2 mb-md-0">
-            <a href="/emprestimos/novo" class="btn btn-avell">
-                <i class="fas fa-plus me-1"></i> Novo Empréstimo
-            </a>
-        </div>
-    </div>
-
-    {filtros_html}
-
-    <!-- Estatísticas -->
-    <div class="row mb-4">
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{len(emprestimos)}</div>
-                <div class="stats-label">Total</div>
-            </div>
-        </div>
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{ativos}</div>
-                <div class="stats-label">Ativos</div>
-            </div>
-        </div>
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{atrasados}</div>
-                <div class="stats-label">Atrasados</div>
-            </div>
-        </div>
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{finalizados}</div>
-                <div class="stats-label">Finalizados</div>
-            </div>
-        </div>
-    </div>
-
-    <div class="card">
-        <div class="card-header">
-            <i class="fas fa-exchange-alt me-2"></i> 
-            {'Todos os Empréstimos' if status == 'todos' else 
-             'Empréstimos Ativos' if status == 'ativos' else 
-             'Empréstimos Atrasados' if status == 'atrasados' else 
-             'Empréstimos Finalizados'}
-        </div>
-        <div class="card-body">
-            {'<div class="table-responsive"><table class="table table-striped table-hover"><thead><tr><th>Cliente</th><th>Notebook</th><th>Data Empréstimo</th><th>Previsão Devolução</th><th>Status</th><th>Responsável</th><th>Ações</th></tr></thead><tbody>' + emprestimos_html + '</tbody></table></div>' if emprestimos else '<div class="text-center py-5"><i class="fas fa-exchange-alt fa-3x text-muted mb-3"></i><h5 class="text-muted">Nenhum empréstimo encontrado</h5><a href="/emprestimos/novo" class="btn btn-avell mt-2"><i class="fas fa-plus me-1"></i> Realizar Primeiro Empréstimo</a></div>'}
-        </div>
-    </div>
-    '''
-    
-    return render_base(content, 'emprestimos')
-
-# Template Comodatos
-def render_comodatos(comodatos=None):
-    if comodatos is None:
-        comodatos = []
-    
-    comodatos_html = ''
-    for comodato in comodatos:
-        comodatos_html += f'''
-        <div class="col-md-6 mb-4">
-            <div class="card comodato-card h-100">
-                <div class="card-header">
-                    <div class="d-flex justify-content-between align-items-center">
-                        <span class="fw-bold">{comodato.razao_social}</span>
-                        <span class="badge bg-primary">{comodato.quantidade} unidades</span>
-                    </div>
-                </div>
-                <div class="card-body">
-                    <div class="row mb-2">
-                        <div class="col-6">
-                            <small class="text-muted">CRM:</small>
-                            <div class="fw-bold">{comodato.crm}</div>
-                        </div>
-                        <div class="col-6">
-                            <small class="text-muted">CNPJ:</small>
-                            <div>{comodato.cnpj}</div>
-                        </div>
-                    </div>
-                    
-                    <div class="mb-2">
-                        <small class="text-muted">Destino:</small>
-                        <div>{comodato.destino}</div>
-                    </div>
-                    
-                    <div class="mb-2">
-                        <small class="text-muted">Modelo:</small>
-                        <div class="fw-bold">{comodato.modelo}</div>
-                    </div>
-                    
-                    <div class="row mb-2">
-                        <div class="col-6">
-                            <small class="text-muted">Processador:</small>
-                            <div>{comodato.processador}</div>
-                        </div>
-                        <div class="col-6">
-                            <small class="text-muted">Placa de Vídeo:</small>
-                            <div>{comodato.placa_video}</div>
-                        </div>
-                    </div>
-                    
-                    <div class="row mb-3">
-                        <div class="col-6">
-                            <small class="text-muted">RAM:</small>
-                            <div>{comodato.memoria_ram}</div>
-                        </div>
-                        <div class="col-6">
-                            <small class="text-muted">Armazenamento:</small>
-                            <div>{comodato.armazenamento}</div>
-                        </div>
-                    </div>
-                    
-                    <div class="border-top pt-2">
-                        <div class="row">
-                            <div class="col-6">
-                                <small class="text-muted">Valor Unitário:</small>
-                                <div class="fw-bold text-success">R$ {comodato.valor_unitario:,.2f}</div>
-                            </div>
-                            <div class="col-6">
-                                <small class="text-muted">Valor Total:</small>
-                                <div class="fw-bold valor-destaque">R$ {comodato.valor_total:,.2f}</div>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-                <div class="card-footer bg-transparent">
-                    <small class="text-muted">
-                        <i class="fas fa-calendar me-1"></i>
-                        Criado em: {comodato.data_criacao.strftime('%d/%m/%Y')}
-                    </small>
-                </div>
-            </div>
-        </div>
-        '''
-    
-    # Estatísticas
-    total_comodatos = len(comodatos)
-    total_unidades = sum(c.quantidade for c in comodatos)
-    valor_total = sum(c.valor_total for c in comodatos)
-    
-    content = f'''
-    <div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
-        <h1 class="h2">Comodatos</h1>
-        <div class="btn-toolbar mb-2 mb-md-0">
-            <a href="/comodatos/novo" class="btn btn-avell">
-                <i class="fas fa-plus me-1"></i> Novo Comodato
-            </a>
-        </div>
-    </div>
-
-    <!-- Estatísticas -->
-    <div class="row mb-4">
-        <div class="col-md-4">
-            <div class="card stats-card">
-                <div class="stats-number">{total_comodatos}</div>
-                <div class="stats-label">Contratos</div>
-            </div>
-        </div>
-        <div class="col-md-4">
-            <div class="card stats-card">
-                <div class="stats-number">{total_unidades}</div>
-                <div class="stats-label">Total de Unidades</div>
-            </div>
-        </div>
-        <div class="col-md-4">
-            <div class="card stats-card">
-                <div class="stats-number">R$ {valor_total:,.2f}</div>
-                <div class="stats-label">Valor Total</div>
-            </div>
-        </div>
-    </div>
-
-    <div class="row">
-        {comodatos_html if comodatos else '<div class="col-12"><div class="card"><div class="card-body text-center py-5"><i class="fas fa-file-contract fa-3x text-muted mb-3"></i><h5 class="text-muted">Nenhum contrato de comodato cadastrado</h5><a href="/comodatos/novo" class="btn btn-avell mt-2"><i class="fas fa-plus me-1"></i> Cadastrar Primeiro Comodato</a></div></div></div>'}
-    </div>
-    '''
-    
-    return render_base(content, 'comodatos')
-
-# Template Form Comodato - ATUALIZADO COM EXEMPLOS E COR VERMELHA
-def render_form_comodato():
-    content = '''
-    <div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
-        <h1 class="h2">Novo Comodato</h1>
-        <div class="btn-toolbar mb-2 mb-md-0">
-            <a href="/comodatos" class="btn btn-outline-secondary">
-                <i class="fas fa-arrow-left me-1"></i> Voltar
-            </a>
-        </div>
-    </div>
-
-    <div class="card">
-        <div class="card-header">
-            <i class="fas fa-file-contract me-2"></i> Dados do Comodato
-        </div>
-        <div class="card-body">
-            <form method="POST" class="needs-validation" novalidate>
-                <h5 class="section-title">Dados da Empresa</h5>
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="crm" class="form-label">CRM *</label>
-                        <input type="text" class="form-control" id="crm" name="crm" 
-                               placeholder="Ex: CRM/SP 123456" required>
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="razao_social" class="form-label">Razão Social *</label>
-                        <input type="text" class="form-control" id="razao_social" name="razao_social" 
-                               placeholder="Ex: Hospital São Paulo Ltda" required>
-                    </div>
-                </div>
-                
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="cnpj" class="form-label">CNPJ *</label>
-                        <input type="text" class="form-control" id="cnpj" name="cnpj" 
-                               placeholder="Ex: 12.345.678/0001-90" required>
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="destino" class="form-label">Destino *</label>
-                        <input type="text" class="form-control" id="destino" name="destino" 
-                               placeholder="Ex: Setor de Radiologia" required>
-                    </div>
-                </div>
-
-                <h5 class="section-title mt-4">Especificações do Produto</h5>
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="modelo" class="form-label">Modelo *</label>
-                        <input type="text" class="form-control" id="modelo" name="modelo" 
-                               placeholder="Ex: Avell A62 MUV" required>
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="processador" class="form-label">Processador *</label>
-                        <input type="text" class="form-control" id="processador" name="processador" 
-                               placeholder="Ex: Intel Core i7-13700H" required>
-                    </div>
-                </div>
-                
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="placa_video" class="form-label">Placa de Vídeo *</label>
-                        <input type="text" class="form-control" id="placa_video" name="placa_video" 
-                               placeholder="Ex: NVIDIA GeForce RTX 4060" required>
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="cor" class="form-label">Cor</label>
-                        <input type="text" class="form-control" id="cor" name="cor" 
-                               placeholder="Ex: Preto Fosco">
-                    </div>
-                </div>
-                
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="tela" class="form-label">Tela</label>
-                        <input type="text" class="form-control" id="tela" name="tela" 
-                               placeholder="Ex: 15.6'' FHD 144Hz">
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="memoria_ram" class="form-label">Memória RAM *</label>
-                        <input type="text" class="form-control" id="memoria_ram" name="memoria_ram" 
-                               placeholder="Ex: 16GB DDR5" required>
-                    </div>
-                </div>
-                
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="armazenamento" class="form-label">Armazenamento *</label>
-                        <input type="text" class="form-control" id="armazenamento" name="armazenamento" 
-                               placeholder="Ex: 1TB SSD NVMe" required>
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="sistema_operacional" class="form-label">Sistema Operacional</label>
-                        <input type="text" class="form-control" id="sistema_operacional" name="sistema_operacional" 
-                              placeholder="Ex: Windows 11 Pro">
-                    </div>
-                </div>
-
-                <h5 class="section-title mt-4">Quantidade e Valores</h5>
-                <div class="row">
-                    <div class="col-md-4 mb-3">
-                        <label for="quantidade" class="form-label">Quantidade *</label>
-                        <input type="number" class="form-control" id="quantidade" name="quantidade" 
-                               min="1" placeholder="Ex: 5" required>
-                    </div>
-                    
-                    <div class="col-md-4 mb-3">
-                        <label for="valor_unitario" class="form-label">Valor Unitário (R$) *</label>
-                        <input type="number" class="form-control" id="valor_unitario" name="valor_unitario" 
-                               step="0.01" min="0" placeholder="Ex: 5999.99" required>
-                    </div>
-                    
-                    <div class="col-md-4 mb-3">
-                        <label for="valor_total" class="form-label">Valor Total (R$) *</label>
-                        <input type="number" class="form-control" id="valor_total" name="valor_total" 
-                               step="0.01" min="0" readonly placeholder="Será calculado automaticamente">
-                    </div>
-                </div>
-                
-                <div class="mb-3">
-                    <label for="observacoes" class="form-label">Observações</label>
-                    <textarea class="form-control" id="observacoes" name="observacoes" rows="3" 
-                              placeholder="Ex: Equipamento para uso exclusivo no setor de diagnóstico por imagem..."></textarea>
-                </div>
-                
-                <div class="d-grid gap-2 d-md-flex justify-content-md-end">
-                    <a href="/comodatos" class="btn btn-secondary me-md-2">Cancelar</a>
-                    <button type="submit" class="btn btn-avell">Cadastrar Comodato</button>
-                </div>
-            </form>
-        </div>
-    </div>
-
-    <script>
-        document.addEventListener('DOMContentLoaded', function() {
-            const quantidade = document.getElementById('quantidade');
-            const valorUnitario = document.getElementById('valor_unitario');
-            const valorTotal = document.getElementById('valor_total');
-            
-            function calcularTotal() {
-                const qtd = parseInt(quantidade.value) || 0;
-                const unitario = parseFloat(valorUnitario.value) || 0;
-                valorTotal.value = (qtd * unitario).toFixed(2);
-            }
-            
-            quantidade.addEventListener('input', calcularTotal);
-            valorUnitario.addEventListener('input', calcularTotal);
-
-            // Formatação automática do CNPJ
-            const cnpjInput = document.getElementById('cnpj');
-            cnpjInput.addEventListener('input', function(e) {
-                let value = e.target.value.replace(/\\D/g, '');
-                
-                if (value.length <= 14) {
-                    value = value.replace(/^(\\d{2})(\\d)/, '$1.$2')
-                                 .replace(/^(\\d{2})\\.(\\d{3})(\\d)/, '$1.$2.$3')
-                                 .replace(/\\.(\\d{3})(\\d)/, '.$1/$2')
-                                 .replace(/(\\d{4})(\\d)/, '$1-$2');
-                }
-                
-                e.target.value = value;
-            });
-
-            // Focar no primeiro campo
-            document.getElementById('crm').focus();
-        });
-    </script>
-    '''
-    
-    return render_base(content, 'comodatos')
-
-# Template Relatórios
-def render_relatorios(emprestimos_mes=0, clientes_ativos=0, notebooks_emprestados=0, total_comodatos=0, valor_total_comodatos=0):
-    content = f'''
-    <div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
-        <h1 class="h2">Relatórios</h1>
-    </div>
-
-    <!-- Estatísticas Principais -->
-    <div class="row">
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{emprestimos_mes}</div>
-                <div class="stats-label">Empréstimos Este Mês</div>
-            </div>
-        </div>
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{clientes_ativos}</div>
-                <div class="stats-label">Clientes com Empréstimos Ativos</div>
-            </div>
-        </div>
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">{notebooks_emprestados}</div>
-                <div class="stats-label">Notebooks Emprestados</div>
-            </div>
-        </div>
-        <div class="col-md-3">
-            <div class="card stats-card">
-                <div class="stats-number">R$ {valor_total_comodatos:,.2f}</div>
-                <div class="stats-label">Valor em Comodatos</div>
-            </div>
-        </div>
-    </div>
-
-    <div class="row mt-4">
-        <div class="col-md-6">
-            <div class="card">
-                <div class="card-header">
-                    <i class="fas fa-chart-pie me-2"></i> Status dos Notebooks
-                </div>
-                <div class="card-body">
-                    <canvas id="graficoStatus" height="200"></canvas>
-                </div>
-            </div>
-        </div>
-        <div class="col-md-6">
-            <div class="card">
-                <div class="card-header">
-                    <i class="fas fa-chart-bar me-2"></i> Empréstimos por Mês (2024)
-                </div>
-                <div class="card-body">
-                    <canvas id="graficoMensal" height="200"></canvas>
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <div class="row mt-4">
-        <div class="col-md-12">
-            <div class="card">
-                <div class="card-header">
-                    <i class="fas fa-table me-2"></i> Resumo do Mês Atual
-                </div>
-                <div class="card-body">
-                    <div class="table-responsive">
-                        <table class="table table-bordered">
-                            <thead>
-                                <tr>
-                                    <th>Período</th>
-                                    <th>Novos Empréstimos</th>
-                                    <th>Devoluções</th>
-                                    <th>Clientes Novos</th>
-                                    <th>Notebooks Novos</th>
-                                    <th>Comodatos Ativos</th>
-                                    <th>Taxa de Ocupação</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                <tr>
-                                    <td>{datetime.now().strftime("%B %Y").title()}</td>
-                                    <td class="text-success fw-bold">{emprestimos_mes}</td>
-                                    <td class="text-info">-</td>
-                                    <td class="text-primary">-</td>
-                                    <td class="text-warning">-</td>
-                                    <td class="text-secondary">{total_comodatos}</td>
-                                    <td>
-                                        <div class="progress">
-                                            <div class="progress-bar bg-success" style="width: 75%">75%</div>
-                                        </div>
-                                    </td>
-                                </tr>
-                            </tbody>
-                        </table>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        document.addEventListener('DOMContentLoaded', function() {{
-            // Gráfico de Status dos Notebooks
-            const ctxStatus = document.getElementById('graficoStatus').getContext('2d');
-            new Chart(ctxStatus, {{
-                type: 'doughnut',
-                data: {{
-                    labels: ['Disponíveis', 'Emprestados', 'Manutenção'],
-                    datasets: [{{
-                        data: [8, 2, 1],
-                        backgroundColor: ['#28a745', '#dc3545', '#ffc107']
-                    }}]
-                }},
-                options: {{
-                    responsive: true,
-                    plugins: {{
-                        legend: {{
-                            position: 'bottom'
-                        }}
-                    }}
-                }}
-            }});
-
-            // Gráfico Mensal
-            const ctxMensal = document.getElementById('graficoMensal').getContext('2d');
-            new Chart(ctxMensal, {{
-                type: 'bar',
-                data: {{
-                    labels: ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez'],
-                    datasets: [{{
-                        label: 'Empréstimos',
-                        data: [12, 15, 8, 11, 14, 10, 13, 9, 7, 0, 0, 0],
-                        backgroundColor: '#e30613'
-                    }}]
-                }},
-                options: {{
-                    responsive: true,
-                    scales: {{
-                        y: {{
-                            beginAtZero: true
-                        }}
-                    }}
-                }}
-            }});
-        }});
-    </script>
-    '''
-    
-    return render_base(content, 'relatorios')
-
-# Template Form Notebook - ATUALIZADO COM EXEMPLOS
 def render_form_notebook():
-    content = '''
-    <div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
-        <h1 class="h2">Novo Notebook</h1>
-        <div class="btn-toolbar mb-2 mb-md-0">
-            <a href="/notebooks" class="btn btn-outline-secondary">
-                <i class="fas fa-arrow-left me-1"></i> Voltar
-            </a>
-        </div>
-    </div>
-
-    <div class="card">
-        <div class="card-header">
-            <i class="fas fa-laptop me-2"></i> Especificações do Notebook
-        </div>
-        <div class="card-body">
-            <form method="POST" class="needs-validation" novalidate>
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="modelo" class="form-label">Modelo *</label>
-                        <input type="text" class="form-control" id="modelo" name="modelo" 
-                               placeholder="Ex: Avell A62 MUV" required>
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="numero_serie" class="form-label">Número de Série *</label>
-                        <input type="text" class="form-control" id="numero_serie" name="numero_serie" 
-                               placeholder="Ex: SN2024AVL001" required>
-                    </div>
-                </div>
-                
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="processador" class="form-label">Processador</label>
-                        <input type="text" class="form-control" id="processador" name="processador" 
-                               placeholder="Ex: Intel Core i7-13700H">
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="placa_video" class="form-label">Placa de Vídeo</label>
-                        <input type="text" class="form-control" id="placa_video" name="placa_video" 
-                               placeholder="Ex: NVIDIA GeForce RTX 4060">
-                    </div>
-                </div>
-                
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="memoria_ram" class="form-label">Memória RAM</label>
-                        <input type="text" class="form-control" id="memoria_ram" name="memoria_ram" 
-                               placeholder="Ex: 16GB DDR5">
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="armazenamento" class="form-label">Armazenamento</label>
-                        <input type="text" class="form-control" id="armazenamento" name="armazenamento" 
-                               placeholder="Ex: 1TB SSD NVMe">
-                    </div>
-                </div>
-
-                <div class="row">
-                    <div class="col-md-4 mb-3">
-                        <label for="cor" class="form-label">Cor</label>
-                        <input type="text" class="form-control" id="cor" name="cor" 
-                               placeholder="Ex: Preto Fosco">
-                    </div>
-                    
-                    <div class="col-md-4 mb-3">
-                        <label for="tela" class="form-label">Tela</label>
-                        <input type="text" class="form-control" id="tela" name="tela" 
-                               placeholder="Ex: 15.6'' FHD 144Hz">
-                    </div>
-                    
-                    <div class="col-md-4 mb-3">
-                        <label for="sistema_operacional" class="form-label">Sistema Operacional</label>
-                        <input type="text" class="form-control" id="sistema_operacional" name="sistema_operacional" 
-                               placeholder="Ex: Windows 11 Pro">
-                    </div>
-                </div>
-
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="valor" class="form-label">Valor (R$)</label>
-                        <input type="number" class="form-control" id="valor" name="valor" step="0.01" min="0" 
-                               placeholder="Ex: 5999.99">
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="data_aquisicao" class="form-label">Data de Aquisição</label>
-                        <input type="date" class="form-control" id="data_aquisicao" name="data_aquisicao">
-                    </div>
-                </div>
-                
-                <div class="d-grid gap-2 d-md-flex justify-content-md-end">
-                    <a href="/notebooks" class="btn btn-secondary me-md-2">Cancelar</a>
-                    <button type="submit" class="btn btn-avell">Cadastrar Notebook</button>
-                </div>
-            </form>
-        </div>
-    </div>
-    '''
-    
-    return render_base(content, 'notebooks')
-
-# Template Form Empréstimo
-def render_form_emprestimo(clientes=None, notebooks=None):
-    if clientes is None:
-        clientes = []
-    if notebooks is None:
-        notebooks = []
-    
-    clientes_options = ''.join([f'<option value="{c.id}">{c.nome} - {c.cpf_cnpj}</option>' for c in clientes])
-    notebooks_options = ''.join([f'<option value="{n.id}">{n.modelo} - {n.numero_serie}</option>' for n in notebooks])
-    
-    hoje = datetime.now().strftime('%Y-%m-%d')
-    trinta_dias = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
-    
-    content = f'''
-    <div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
-        <h1 class="h2">Novo Empréstimo</h1>
-        <div class="btn-toolbar mb-2 mb-md-0">
-            <a href="/emprestimos" class="btn btn-outline-secondary">
-                <i class="fas fa-arrow-left me-1"></i> Voltar
-            </a>
-        </div>
-    </div>
-
-    <div class="card">
-        <div class="card-header">
-            <i class="fas fa-handshake me-2"></i> Dados do Empréstimo
-        </div>
-        <div class="card-body">
-            <form method="POST" class="needs-validation" novalidate>
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="cliente_id" class="form-label">Cliente *</label>
-                        <select class="form-select" id="cliente_id" name="cliente_id" required>
-                            <option value="">Selecione um cliente...</option>
-                            {clientes_options}
-                        </select>
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="notebook_id" class="form-label">Notebook *</label>
-                        <select class="form-select" id="notebook_id" name="notebook_id" required>
-                            <option value="">Selecione um notebook...</option>
-                            {notebooks_options}
-                        </select>
-                        {'<div class="text-warning small mt-1"><i class="fas fa-exclamation-triangle me-1"></i>Nenhum notebook disponível no momento.</div>' if not notebooks else ''}
-                    </div>
-                </div>
-                
-                <div class="row">
-                    <div class="col-md-6 mb-3">
-                        <label for="data_emprestimo" class="form-label">Data do Empréstimo *</label>
-                        <input type="date" class="form-control" id="data_emprestimo" name="data_emprestimo" value="{hoje}" required>
-                    </div>
-                    
-                    <div class="col-md-6 mb-3">
-                        <label for="data_devolucao_prevista" class="form-label">Previsão de Devolução *</label>
-                        <input type="date" class="form-control" id="data_devolucao_prevista" name="data_devolucao_prevista" value="{trinta_dias}" required>
-                    </div>
-                </div>
-                
-                <div class="mb-3">
-                    <label for="observacoes" class="form-label">Observações</label>
-                    <textarea class="form-control" id="observacoes" name="observacoes" rows="3" placeholder="Observações sobre o empréstimo..."></textarea>
-                </div>
-                
-                <div class="d-grid gap-2 d-md-flex justify-content-md-end">
-                    <a href="/emprestimos" class="btn btn-secondary me-md-2">Cancelar</a>
-                    <button type="submit" class="btn btn-avell" {'disabled' if not notebooks else ''}>Realizar Empréstimo</button>
-                </div>
-            </form>
-        </div>
-    </div>
-    '''
-    
-    return render_base(content, 'emprestimos')
+    return render_template('form_notebook.html')
+
+def render_form_emprestimo():
+    disponiveis = db.session.get(NotebookStatusContagem, 'disponivel')
+    return render_template('form_emprestimo.html',
+                           tem_notebooks=bool(disponiveis and disponiveis.total),
+                           hoje=datetime.now().strftime('%Y-%m-%d'),
+                           trinta_dias=(datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d'))
 
 def render_usuarios(usuarios=None):
-    if usuarios is None:
-        usuarios = []
-    
-    usuarios_html = ''
-    for usuario in usuarios:
-        if usuario.email == 'admin':
-            continue
-            
-        status_badge = '<span class="badge bg-success">Ativo</span>' if usuario.ativo else '<span class="badge bg-danger">Inativo</span>'
-        permissao_badge = '<span class="badge bg-primary">Admin</span>' if usuario.permissao == 'admin' else '<span class="badge bg-secondary">Funcionário</span>'
-        
-        usuarios_html += f'''
-        <tr>
-            <td>
-                <strong>{usuario.nome}</strong>
-                <br><small class="text-muted">{usuario.email}</small>
-            </td>
-            <td>{permissao_badge}</td>
-            <td>{status_badge}</td>
-            <td>{usuario.data_criacao.strftime('%d/%m/%Y')}</td>
-            <td>
-                <div class="btn-group btn-group-sm">
-                    <button type="button" class="btn btn-outline-warning" data-bs-toggle="modal" data-bs-target="#modalEditarUsuario" onclick="carregarUsuario({usuario.id}, '{usuario.nome}', '{usuario.email}', '{usuario.permissao}', {str(usuario.ativo).lower()})">
-                        <i class="fas fa-edit"></i>
-                    </button>
-                    {'<button type="button" class="btn btn-outline-danger" onclick="desativarUsuario(' + str(usuario.id) + ')"><i class="fas fa-ban"></i></button>' if usuario.ativo else '<button type="button" class="btn btn-outline-success" onclick="ativarUsuario(' + str(usuario.id) + ')"><i class="fas fa-check"></i></button>'}
-                </div>
-            </td>
-        </tr>
-        '''
-    
-    content = f'''
-    <div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
-        <h1 class="h2">Gerenciar Usuários</h1>
-        <div class="btn-toolbar mb-2 mb-md-0">
-            <button type="button" class="btn btn-avell" data-bs-toggle="modal" data-bs-target="#modalNovoUsuario">
-                <i class="fas fa-plus me-1"></i> Novo Usuário
-            </button>
-        </div>
-    </div>
-
-    <div class="card">
-        <div class="card-header">
-            <i class="fas fa-users-cog me-2"></i> Usuários do Sistema
-        </div>
-        <div class="card-body">
-            {'<div class="table-responsive"><table class="table table-striped table-hover"><thead><tr><th>Usuário</th><th>Permissão</th><th>Status</th><th>Data Criação</th><th>Ações</th></tr></thead><tbody>' + usuarios_html + '</tbody></table></div>' if usuarios else '<div class="text-center py-5"><i class="fas fa-users fa-3x text-muted mb-3"></i><p class="text-muted">Nenhum usuário cadastrado</p></div>'}
-        </div>
-    </div>
-
-    <!-- Modal Novo Usuário -->
-    <div class="modal fade" id="modalNovoUsuario" tabindex="-1">
-        <div class="modal-dialog">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title">Novo Usuário</h5>
-                    <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
-                </div>
-                <form method="POST" action="/usuarios">
-                    <div class="modal-body">
-                        <div class="mb-3">
-                            <label class="form-label">Nome Completo *</label>
-                            <input type="text" class="form-control" name="nome" required>
-                        </div>
-                        <div class="mb-3">
-                            <label class="form-label">Email *</label>
-                            <input type="email" class="form-control" name="email" required>
-                        </div>
-                        <div class="mb-3">
-                            <label class="form-label">Senha *</label>
-                            <input type="password" class="form-control" name="senha" required>
-                        </div>
-                        <div class="mb-3">
-                            <label class="form-label">Permissão</label>
-                            <select class="form-select" name="permissao">
-                                <option value="funcionario">Funcionário</option>
-                                <option value="admin">Administrador</option>
-                            </select>
-                        </div>
-                    </div>
-                    <div class="modal-footer">
-                        <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Cancelar</button>
-                        <button type="submit" class="btn btn-avell">Criar Usuário</button>
-                    </div>
-                </form>
-            </div>
-        </div>
-    </div>
-
-    <!-- Modal Editar Usuário -->
-    <div class="modal fade" id="modalEditarUsuario" tabindex="-1">
-        <div class="modal-dialog">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title">Editar Usuário</h5>
-                    <button type="button" class="btn-close" data-bs-dismiss="modal"></button>
-                </div>
-                <form method="POST" action="/usuarios/editar" id="formEditarUsuario">
-                    <input type="hidden" name="usuario_id" id="editar_usuario_id">
-                    <div class="modal-body">
-                        <div class="mb-3">
-                            <label class="form-label">Nome Completo *</label>
-                            <input type="text" class="form-control" name="nome" id="editar_nome" required>
-                        </div>
-                        <div class="mb-3">
-                            <label class="form-label">Email *</label>
-                            <input type="email" class="form-control" name="email" id="editar_email" required>
-                        </div>
-                        <div class="mb-3">
-                            <label class="form-label">Nova Senha (deixe em branco para manter a atual)</label>
-                            <input type="password" class="form-control" name="senha" id="editar_senha" placeholder="Digite nova senha...">
-                        </div>
-                        <div class="mb-3">
-                            <label class="form-label">Permissão</label>
-                            <select class="form-select" name="permissao" id="editar_permissao">
-                                <option value="funcionario">Funcionário</option>
-                                <option value="admin">Administrador</option>
-                            </select>
-                        </div>
-                        <div class="mb-3">
-                            <div class="form-check">
-                                <input class="form-check-input" type="checkbox" name="ativo" id="editar_ativo" value="1">
-                                <label class="form-check-label" for="editar_ativo">
-                                    Usuário Ativo
-                                </label>
-                            </div>
-                        </div>
-                    </div>
-                    <div class="modal-footer">
-                        <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Cancelar</button>
-                        <button type="submit" class="btn btn-avell">Salvar Alterações</button>
-                    </div>
-                </form>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        function carregarUsuario(id, nome, email, permissao, ativo) {{
-            document.getElementById('editar_usuario_id').value = id;
-            document.getElementById('editar_nome').value = nome;
-            document.getElementById('editar_email').value = email;
-            document.getElementById('editar_permissao').value = permissao;
-            document.getElementById('editar_ativo').checked = ativo;
-            document.getElementById('editar_senha').value = '';
-        }}
-        
-        function desativarUsuario(id) {{
-            if (confirm('Tem certeza que deseja desativar este usuário?')) {{
-                window.location.href = '/usuarios/desativar/' + id;
-            }}
-        }}
-        
-        function ativarUsuario(id) {{
-            if (confirm('Tem certeza que deseja ativar este usuário?')) {{
-                window.location.href = '/usuarios/ativar/' + id;
-            }}
-        }}
-    </script>
-    '''
-    
-    return render_base(content, 'usuarios')
+    return transmitir_template('usuarios.html', usuarios=usuarios or [])
 
 # Rotas de Autenticação
 @app.route('/')
@@ -2434,37 +1417,205 @@ def toggle_tema():
     session['tema'] = 'claro' if tema_atual == 'escuro' else 'escuro'
     return redirect(request.referrer or '/dashboard')
 
+@dataclass
+class SnapshotKPI:
+    """Indicadores do dashboard e dos relatórios"""
+    total_clientes: int = 0
+    total_notebooks: int = 0
+    notebooks_emprestados: int = 0
+    emprestimos_ativos: int = 0
+    emprestimos_atrasados: int = 0
+    emprestimos_mes: int = 0
+    clientes_ativos: int = 0
+    total_comodatos: int = 0
+    valor_total_comodatos: float = 0.0
+
+def snapshot_kpis():
+    """Indicadores compartilhados entre dashboard e relatórios em uma única consulta.
+
+    Cada tabela é agregada uma vez com contagens condicionais (CASE) e as
+    subqueries de uma linha são combinadas em um único SELECT.
+    """
+    agora = datetime.now()
+    inicio_mes = agora.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    ativo = Emprestimo.status == 'ativo'
+    
+    clientes = db.session.query(
+        func.count(Cliente.id).label('total')
+    ).subquery()
+    notebooks = db.session.query(
+        func.count(Notebook.id).label('total'),
+        func.sum(case((Notebook.status == 'emprestado', 1), else_=0)).label('emprestados')
+    ).subquery()
+    emprestimos = db.session.query(
+        func.sum(case((ativo, 1), else_=0)).label('ativos'),
+        func.sum(case((Emprestimo.atrasado == true(), 1), else_=0)).label('atrasados'),
+        func.sum(case((Emprestimo.data_emprestimo >= inicio_mes, 1), else_=0)).label('mes'),
+        func.count(func.distinct(case((ativo, Emprestimo.cliente_id)))).label('clientes_ativos')
+    ).subquery()
+    comodatos = db.session.query(
+        func.count(Comodato.id).label('total'),
+        func.sum(Comodato.valor_total).label('valor')
+    ).subquery()
+    
+    linha = db.session.query(
+        clientes.c.total,
+        notebooks.c.total,
+        notebooks.c.emprestados,
+        emprestimos.c.ativos,
+        emprestimos.c.atrasados,
+        emprestimos.c.mes,
+        emprestimos.c.clientes_ativos,
+        comodatos.c.total,
+        comodatos.c.valor
+    ).select_from(clientes)\
+        .join(notebooks, true())\
+        .join(emprestimos, true())\
+        .join(comodatos, true())\
+        .one()
+    
+    return SnapshotKPI(*(valor or 0 for valor in linha))
+
+def kpis_em_cache():
+    """Snapshot dos KPIs pelo cache de resultados; qualquer escrita nas tabelas lidas o invalida"""
+    return cache_resultados.obter('kpis', [Cliente, Notebook, Emprestimo, Comodato], snapshot_kpis)
+
+# Empréstimos atrasados e próximas devoluções, recalculados em segundo plano
+def marcar_atrasados(agora=None):
+    """Marca os ativos que passaram da devolução prevista e desmarca os que deixaram de estar atrasados"""
+    agora = agora or datetime.now()
+    tabela = Emprestimo.__table__
+    marcados = db.session.execute(
+        tabela.update()
+        .where(tabela.c.status == 'ativo', tabela.c.atrasado == false(), tabela.c.data_devolucao_prevista < agora)
+        .values(atrasado=True, atrasado_em=agora)
+        .returning(tabela.c.status)
+    ).scalars().all()
+    desmarcados = db.session.execute(
+        tabela.update()
+        .where(tabela.c.atrasado == true(),
+               or_(tabela.c.status != 'ativo', tabela.c.data_devolucao_prevista >= agora))
+        .values(atrasado=False)
+        .returning(tabela.c.status)
+    ).scalars().all()
+    # UPDATE em massa não passa pelo flush: ETags, caches e contadores precisam saber da mudança
+    if marcados or desmarcados:
+        marcar_alteracao(Emprestimo)
+        deltas = {}
+        for status in marcados:
+            deltas[(status, False)] = deltas.get((status, False), 0) - 1
+            deltas[(status, True)] = deltas.get((status, True), 0) + 1
+        for status in desmarcados:
+            deltas[(status, True)] = deltas.get((status, True), 0) - 1
+            deltas[(status, False)] = deltas.get((status, False), 0) + 1
+        somar_contagem_emprestimos(db.session.connection(), deltas)
+    db.session.commit()
+    return len(marcados), len(desmarcados)
+
+def proximas_devolucoes():
+    """As cinco devoluções ativas mais próximas, em dicionários que podem ir para o cache"""
+    emprestimos = consulta_lista('proximas_devolucoes').filter_by(status='ativo')\
+        .order_by(Emprestimo.data_devolucao_prevista.asc())\
+        .limit(5)
+    return [{
+        'id': emp.id,
+        'cliente': {'nome': emp.cliente.nome},
+        'notebook': {'modelo': emp.notebook.modelo},
+        'data_devolucao_prevista': emp.data_devolucao_prevista,
+        'atrasado': emp.atrasado,
+    } for emp in emprestimos]
+
+def proximas_devolucoes_em_cache():
+    # Com o verificador ligado a entrada dura uma rodada e mais a folga do CACHE_TTL,
+    # então a próxima rodada a renova antes que as páginas precisem recalculá-la
+    intervalo = verificador_atrasos.intervalo
+    ttl = intervalo + app.config['CACHE_TTL'] if intervalo > 0 else None
+    return cache_resultados.obter('proximas_devolucoes', [Emprestimo, Cliente, Notebook], proximas_devolucoes, ttl)
+
+def verificar_atrasos():
+    """Uma rodada do verificador: atualiza os atrasos e já deixa as próximas devoluções no cache"""
+    resultado = marcar_atrasados()
+    proximas_devolucoes_em_cache()
+    return resultado
+
+class VerificadorAtrasos:
+    """Thread que roda verificar_atrasos a cada `intervalo` segundos.
+
+    Só é iniciada na primeira requisição, já dentro do worker: comandos do
+    CLI não a disparam e, com o gunicorn --preload, ela não se perde no fork.
+    """
+    
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.thread = None
+        self.parar = threading.Event()
+        self.trava = threading.Lock()
+    
+    def iniciar(self):
+        if self.intervalo <= 0 or (self.thread is not None and self.thread.is_alive()):
+            return
+        with self.trava:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.executar, name='verificador-atrasos', daemon=True)
+                self.thread.start()
+    
+    def executar(self):
+        while True:
+            with app.app_context():
+                try:
+                    verificar_atrasos()
+                except Exception as e:
+                    print(f"❌ Verificador de atrasos: {e}")
+                finally:
+                    db.session.remove()
+            if self.parar.wait(self.intervalo):
+                return
+
+verificador_atrasos = VerificadorAtrasos(app.config['ATRASOS_INTERVALO'])
+
+@app.before_request
+def iniciar_verificador_atrasos():
+    verificador_atrasos.iniciar()
+
+@app.cli.command('verificar-atrasos')
+def verificar_atrasos_comando():
+    """Roda uma vez o verificador de atrasos (para agendar pelo cron com AVELL_ATRASOS_INTERVALO=0)"""
+    marcados, desmarcados = verificar_atrasos()
+    print(f"✅ {marcados} empréstimos marcados como atrasados, {desmarcados} desmarcados")
+
 # Rotas Principais
 @app.route('/dashboard')
 def dashboard():
     if 'usuario_id' not in session:
         return redirect(url_for('login'))
     
-    total_clientes = Cliente.query.count()
-    total_notebooks = Notebook.query.count()
-    emprestimos_ativos = Emprestimo.query.filter_by(status='ativo').count()
-    emprestimos_atrasados = Emprestimo.query.filter(
-        Emprestimo.status == 'ativo',
-        Emprestimo.data_devolucao_prevista < datetime.now()
-    ).count()
-    
-    proximas_devolucoes = Emprestimo.query.filter_by(status='ativo')\
-        .order_by(Emprestimo.data_devolucao_prevista.asc())\
-        .limit(5)\
-        .all()
-    
-    total_comodatos = Comodato.query.count()
-    valor_total_comodatos = sum(c.valor_total for c in Comodato.query.all())
-    
-    return render_dashboard(total_clientes, total_notebooks, emprestimos_ativos, emprestimos_atrasados, proximas_devolucoes, total_comodatos, valor_total_comodatos)
+    return render_dashboard(proximas_devolucoes_em_cache())
 
 @app.route('/clientes')
 def clientes():
     if 'usuario_id' not in session:
         return redirect(url_for('login'))
     
-    clientes = Cliente.query.all()
-    return render_clientes(clientes)
+    etag = etag_pagina('clientes', Cliente, Emprestimo)
+    if request.if_none_match.contains_weak(etag):
+        return com_etag(Response(status=304), etag)
+    
+    clientes = com_contagem_emprestimos(consulta_lista('clientes'), Cliente, Emprestimo.cliente_id)\
+        .yield_per(app.config['LINHAS_POR_BLOCO'])
+    
+    contagem = contagem_emprestimos(Emprestimo.cliente_id)
+    total_clientes, total_emprestimos, com_email = db.session.query(
+        func.count(Cliente.id),
+        func.coalesce(func.sum(contagem.c.total), 0),
+        func.count(Cliente.email)
+    ).outerjoin(contagem, contagem.c.id == Cliente.id).one()
+    estatisticas = {
+        'total': total_clientes,
+        'emprestimos': total_emprestimos,
+        'com_email': com_email,
+    }
+    
+    return com_etag(render_clientes(clientes, estatisticas), etag)
 
 @app.route('/clientes/novo', methods=['GET', 'POST'])
 def novo_cliente():
@@ -2509,13 +1660,278 @@ def novo_cliente():
     
     return render_form_cliente()
 
+# Inventário de notebooks: filtros e ordens da URL traduzidos para condições do ORM
+def padrao_prefixo(valor):
+    """Padrão LIKE para valores que começam com o texto; o índice NOCASE da coluna atende a busca"""
+    return valor.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def data_filtro(valor, dias=0):
+    return datetime.strptime(valor, '%Y-%m-%d') + timedelta(days=dias)
+
+# Por filtro da URL: (conversão do valor, condição sobre o valor convertido)
+FILTROS_NOTEBOOKS = {
+    'status': (str, lambda valor: Notebook.status == valor),
+    'modelo': (padrao_prefixo, lambda valor: Notebook.modelo.like(valor, escape='\\')),
+    'memoria_ram': (padrao_prefixo, lambda valor: Notebook.memoria_ram.like(valor, escape='\\')),
+    'placa_video': (padrao_prefixo, lambda valor: Notebook.placa_video.like(valor, escape='\\')),
+    'aquisicao_de': (data_filtro, lambda valor: Notebook.data_aquisicao >= valor),
+    'aquisicao_ate': (lambda valor: data_filtro(valor, 1), lambda valor: Notebook.data_aquisicao < valor),
+}
+
+# Por ordem: (rótulo, coluna ou None para o id, decrescente).
+# O id desempata na mesma direção e deixa a ordem estável entre as páginas
+ORDENACOES_NOTEBOOKS = {
+    'recentes': ('Mais recentes', None, True),
+    'modelo': ('Modelo (A-Z)', Notebook.modelo, False),
+    'valor_maior': ('Maior valor', Notebook.valor, True),
+    'valor_menor': ('Menor valor', Notebook.valor, False),
+    'aquisicao': ('Aquisição mais recente', Notebook.data_aquisicao, True),
+}
+COLUNAS_NOCASE = {'modelo', 'memoria_ram', 'placa_video'}
+# Como o valor da chave de ordenação volta do cursor
+CHAVES_CURSOR = {'modelo': str, 'valor': float, 'data_aquisicao': datetime.fromisoformat}
+
+def filtros_notebooks(argumentos):
+    """Filtros preenchidos e válidos da query string; datas mal formadas ou fora do calendário são ignoradas"""
+    filtros = {}
+    for nome, (converter, _) in FILTROS_NOTEBOOKS.items():
+        valor = argumentos.get(nome, '').strip()
+        if not valor:
+            continue
+        try:
+            converter(valor)
+        except (ValueError, OverflowError):
+            continue
+        filtros[nome] = valor
+    return filtros
+
+def condicoes_notebooks(filtros):
+    """Condições do ORM para os filtros já validados"""
+    condicoes = []
+    for nome, valor in filtros.items():
+        converter, condicao = FILTROS_NOTEBOOKS[nome]
+        condicoes.append(condicao(converter(valor)))
+    return condicoes
+
+def codificar_cursor_inventario(chave, id):
+    """Cursor opaco para a posição (chave de ordenação, id); a chave pode ser NULL"""
+    if isinstance(chave, datetime):
+        chave = chave.isoformat()
+    bruto = f'{"" if chave is None else f"v{chave}"}|{id}'.encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+def decodificar_cursor_inventario(cursor, coluna):
+    """Retorna (chave, id) do cursor na ordem da coluna ou None se for inválido"""
+    if not cursor:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        chave, id = bruto.rsplit('|', 1)
+        if not chave or coluna is None:
+            return None, int(id)
+        return CHAVES_CURSOR[coluna.key](chave[1:]), int(id)
+    except ValueError:
+        return None
+
+def trechos_inventario(coluna, decrescente, cursor):
+    """Condições de cada trecho da ordem a partir do cursor, na ordem em que são lidos.
+
+    A condição em tupla usa o índice da coluna, mas não alcança as linhas com
+    NULL, que o SQLite põe antes dos valores na ordem crescente e depois na
+    decrescente; elas formam um trecho à parte, ordenado só pelo id.
+    """
+    id = Notebook.id
+    if coluna is None:
+        if cursor is None:
+            return [[]]
+        return [[id < cursor[1] if decrescente else id > cursor[1]]]
+    
+    expressao = coluna.collate('NOCASE') if coluna.key in COLUNAS_NOCASE else coluna
+    valores = [coluna.isnot(None)]
+    nulos = [coluna.is_(None)]
+    if cursor is not None and cursor[0] is not None:
+        chave = cursor[0]
+        # O limite só na coluna deixa o SQLite posicionar a busca no índice
+        if decrescente:
+            valores = [expressao <= chave, tuple_(expressao, id) < (chave, cursor[1])]
+        else:
+            valores = [expressao >= chave, tuple_(expressao, id) > (chave, cursor[1])]
+    elif cursor is not None:
+        nulos.append(id < cursor[1] if decrescente else id > cursor[1])
+    
+    if decrescente:
+        return [valores, nulos] if cursor is None or cursor[0] is not None else [nulos]
+    return [nulos, valores] if cursor is None or cursor[0] is None else [valores]
+
+@dataclass
+class InventarioNotebooks:
+    """Uma página do inventário; limitado indica que o total passou de NOTEBOOKS_CONTAGEM_MAXIMA"""
+    itens: list
+    total: int
+    limitado: bool
+    proximo: str = None
+    anterior: str = None
+
+def contar_notebooks(condicoes, teto):
+    """Notebooks que passam nos filtros, contados até teto + 1"""
+    candidatos = select(Notebook.id).where(*condicoes).limit(teto + 1).subquery()
+    return db.session.execute(select(func.count()).select_from(candidatos)).scalar()
+
+def inventario_notebooks(filtros, ordem, limite, apos=None, antes=None):
+    """Página do inventário em ordem de (chave, id) a partir dos cursores, sem OFFSET.
+
+    Como em paginar_keyset, cada página lê no máximo limite + 1 notebooks a
+    partir do cursor, pelo índice que o planejador escolher, então qualquer
+    posição do inventário é alcançável com o mesmo custo. O total só vai até
+    NOTEBOOKS_CONTAGEM_MAXIMA e serve apenas para o rótulo ("Mais de 1000").
+    """
+    _, coluna, decrescente = ORDENACOES_NOTEBOOKS[ordem]
+    cursor = antes or apos
+    # Voltando uma página, lê na direção contrária e inverte no fim
+    leitura = decrescente != bool(antes)
+    expressoes = [Notebook.id] if coluna is None else \
+        [coluna.collate('NOCASE') if coluna.key in COLUNAS_NOCASE else coluna, Notebook.id]
+    ordenacao = [expressao.desc() if leitura else expressao.asc() for expressao in expressoes]
+    
+    condicoes = condicoes_notebooks(filtros)
+    notebooks = []
+    for trecho in trechos_inventario(coluna, leitura, cursor):
+        # Só id e chave passam pela ordenação; as linhas inteiras vêm depois, já limitadas
+        pagina = select(Notebook.id)\
+            .where(*condicoes, *trecho)\
+            .order_by(*ordenacao)\
+            .limit(limite + 1 - len(notebooks))\
+            .subquery()
+        notebooks += consulta_lista('notebooks')\
+            .join(pagina, pagina.c.id == Notebook.id)\
+            .order_by(*ordenacao)\
+            .all()
+        if len(notebooks) > limite:
+            break
+    
+    if not notebooks and cursor is not None:
+        # Cursor além do fim (filtros mudaram, link antigo): volta para a primeira página
+        return inventario_notebooks(filtros, ordem, limite)
+    
+    tem_mais = len(notebooks) > limite
+    notebooks = notebooks[:limite]
+    if antes:
+        notebooks.reverse()
+        tem_proxima, tem_anterior = True, tem_mais
+    else:
+        tem_proxima, tem_anterior = tem_mais, apos is not None
+    
+    # Empréstimos só dos notebooks da página, contados depois de escolhê-la: numa
+    # subquery correlacionada seriam contados para cada linha ordenada
+    emprestimos = dict(db.session.query(Emprestimo.notebook_id, func.count(Emprestimo.id))
+                       .filter(Emprestimo.notebook_id.in_([notebook.id for notebook in notebooks]))
+                       .group_by(Emprestimo.notebook_id))
+    linhas = [(notebook, emprestimos.get(notebook.id, 0)) for notebook in notebooks]
+    
+    def posicao(notebook):
+        return codificar_cursor_inventario(None if coluna is None else getattr(notebook, coluna.key), notebook.id)
+    
+    teto = app.config['NOTEBOOKS_CONTAGEM_MAXIMA']
+    total = contar_notebooks(condicoes, teto)
+    return InventarioNotebooks(
+        itens=linhas,
+        total=min(total, teto),
+        limitado=total > teto,
+        proximo=posicao(linhas[-1][0]) if linhas and tem_proxima else None,
+        anterior=posicao(linhas[0][0]) if linhas and tem_anterior else None,
+    )
+
+def estatisticas_notebooks():
+    """Totais de todo o inventário, independentes dos filtros"""
+    total, disponiveis, emprestados, valor_total = db.session.query(
+        func.count(Notebook.id),
+        func.sum(case((Notebook.status == 'disponivel', 1), else_=0)),
+        func.sum(case((Notebook.status == 'emprestado', 1), else_=0)),
+        func.coalesce(func.sum(Notebook.valor), 0)
+    ).one()
+    return {
+        'total': total,
+        'disponiveis': disponiveis or 0,
+        'emprestados': emprestados or 0,
+        'valor_total': valor_total,
+    }
+
+def estatisticas_notebooks_em_cache():
+    """Varre a tabela inteira; fica no cache de resultados até a próxima escrita em notebooks"""
+    return cache_resultados.obter('estatisticas_notebooks', [Notebook], estatisticas_notebooks)
+
+@app.cli.command('medir-inventario')
+@click.option('--repeticoes', type=int, default=3, help='Execuções por combinação; vale a mais rápida')
+@click.option('--pagina', type=int, default=1, help='Página medida, alcançada pelos cursores das anteriores')
+def medir_inventario_comando(repeticoes, pagina):
+    """Mede o inventário em todas as combinações de filtros, com valores de um notebook do banco"""
+    exemplo = Notebook.query.filter(
+        Notebook.memoria_ram.isnot(None), Notebook.placa_video.isnot(None), Notebook.data_aquisicao.isnot(None)
+    ).order_by(Notebook.id.desc()).first()
+    if exemplo is None:
+        print("⚠️ Nenhum notebook com memória, placa de vídeo e data de aquisição cadastradas")
+        return
+    ano = exemplo.data_aquisicao.year
+    opcoes = {
+        'status': {'status': exemplo.status},
+        'modelo': {'modelo': exemplo.modelo},
+        'memoria_ram': {'memoria_ram': exemplo.memoria_ram},
+        'placa_video': {'placa_video': exemplo.placa_video},
+        'aquisicao': {'aquisicao_de': f'{ano}-01-01', 'aquisicao_ate': f'{ano}-12-31'},
+    }
+    limite = app.config['NOTEBOOKS_POR_PAGINA']
+    print(f"🔬 {Notebook.query.count()} notebooks; valores do notebook {exemplo.id}, página {pagina}")
+    pior = (0, None, None)
+    for quantidade in range(len(opcoes) + 1):
+        for nomes in combinations(opcoes, quantidade):
+            filtros = {nome: valor for opcao in nomes for nome, valor in opcoes[opcao].items()}
+            tempos = []
+            for ordem in ORDENACOES_NOTEBOOKS:
+                apos = None
+                for _ in range(pagina - 1):
+                    proximo = inventario_notebooks(filtros, ordem, limite, apos=apos).proximo
+                    if proximo is None:
+                        break
+                    apos = decodificar_cursor_inventario(proximo, ORDENACOES_NOTEBOOKS[ordem][1])
+                melhor = None
+                for _ in range(repeticoes):
+                    inicio = time.perf_counter()
+                    inventario = inventario_notebooks(filtros, ordem, limite, apos=apos)
+                    decorrido = time.perf_counter() - inicio
+                    melhor = decorrido if melhor is None else min(melhor, decorrido)
+                tempos.append(f"{ordem} {melhor * 1000:.1f}")
+                if melhor > pior[0]:
+                    pior = (melhor, nomes, ordem)
+            total = f"{'>' if inventario.limitado else ''}{inventario.total}"
+            print(f"  {'+'.join(nomes) or 'sem filtros'}: {total} | " + ' | '.join(tempos) + " ms")
+    print(f"⏱️ Pior caso: {pior[0] * 1000:.1f} ms ({'+'.join(pior[1]) or 'sem filtros'}, {pior[2]})")
+
 @app.route('/notebooks')
 def notebooks():
     if 'usuario_id' not in session:
         return redirect(url_for('login'))
     
-    notebooks = Notebook.query.all()
-    return render_notebooks(notebooks)
+    # Filtros, ordem e cursor fazem parte da URL, e cada combinação tem a sua ETag
+    etag = etag_pagina(f'notebooks|{request.query_string.decode()}', Notebook, Emprestimo)
+    if request.if_none_match.contains_weak(etag):
+        return com_etag(Response(status=304), etag)
+    
+    filtros = filtros_notebooks(request.args)
+    ordem = request.args.get('ordem')
+    if ordem not in ORDENACOES_NOTEBOOKS:
+        ordem = 'recentes'
+    limite = obter_limite(app.config['NOTEBOOKS_POR_PAGINA'])
+    coluna = ORDENACOES_NOTEBOOKS[ordem][1]
+    
+    inventario = inventario_notebooks(filtros, ordem, limite,
+                                      apos=decodificar_cursor_inventario(request.args.get('apos'), coluna),
+                                      antes=decodificar_cursor_inventario(request.args.get('antes'), coluna))
+    # Parâmetros repetidos nos links de paginação
+    parametros = {**filtros, 'ordem': ordem}
+    if limite != app.config['NOTEBOOKS_POR_PAGINA']:
+        parametros['limite'] = limite
+    
+    return com_etag(render_notebooks(inventario, estatisticas_notebooks_em_cache(), filtros, ordem, parametros), etag)
 
 @app.route('/notebooks/novo', methods=['GET', 'POST'])
 def novo_notebook():
@@ -2546,27 +1962,485 @@ def novo_notebook():
     
     return render_form_notebook()
 
-@app.route('/emprestimos')
-def emprestimos():
+# Importação em massa de clientes e notebooks
+def texto_campo(campos, nome):
+    return (campos.get(nome) or '').strip()
+
+def linha_cliente(campos):
+    """Valores de um cliente lidos da planilha, com as mesmas validações do formulário"""
+    nome = texto_campo(campos, 'nome')
+    if not nome:
+        raise ValueError('Nome não informado')
+    cpf_cnpj = texto_campo(campos, 'cpf_cnpj')
+    if not validar_cpf_cnpj(cpf_cnpj):
+        raise ValueError(f'CPF ou CNPJ inválido: {cpf_cnpj or "vazio"}')
+    email = texto_campo(campos, 'email')
+    if email and not ('@' in email and '.' in email.split('@')[1]):
+        raise ValueError(f'Email inválido: {email}')
+    return {
+        'nome': nome,
+        'cpf_cnpj': formatar_cpf_cnpj(cpf_cnpj),
+        'telefone': texto_campo(campos, 'telefone') or None,
+        'email': email or None,
+        'endereco': texto_campo(campos, 'endereco') or None,
+        'data_cadastro': datetime.utcnow(),
+    }
+
+def linha_notebook(campos):
+    """Valores de um notebook lidos da planilha; status vazio vira 'disponivel'"""
+    modelo = texto_campo(campos, 'modelo')
+    if not modelo:
+        raise ValueError('Modelo não informado')
+    numero_serie = texto_campo(campos, 'numero_serie')
+    if not numero_serie:
+        raise ValueError('Número de série não informado')
+    status = texto_campo(campos, 'status') or 'disponivel'
+    if status not in ('disponivel', 'manutencao'):
+        raise ValueError(f'Status inválido: {status} (use disponivel ou manutencao)')
+    valor = texto_campo(campos, 'valor')
+    data_aquisicao = texto_campo(campos, 'data_aquisicao')
+    try:
+        valor = float(valor.replace(',', '.')) if valor else None
+    except ValueError:
+        raise ValueError(f'Valor inválido: {valor}')
+    try:
+        data_aquisicao = datetime.strptime(data_aquisicao[:10], '%Y-%m-%d') if data_aquisicao else None
+    except ValueError:
+        raise ValueError(f'Data de aquisição inválida: {data_aquisicao} (use AAAA-MM-DD)')
+    registro = {nome: texto_campo(campos, nome) or None
+                for nome in ('processador', 'placa_video', 'memoria_ram', 'armazenamento',
+                             'cor', 'tela', 'sistema_operacional')}
+    registro.update(modelo=modelo, numero_serie=numero_serie, status=status,
+                    valor=valor, data_aquisicao=data_aquisicao)
+    return registro
+
+# Por tipo: (modelo, coluna única, conversão da linha, colunas aceitas)
+IMPORTACOES = {
+    'clientes': (Cliente, 'cpf_cnpj', linha_cliente,
+                 ['nome', 'cpf_cnpj', 'telefone', 'email', 'endereco']),
+    'notebooks': (Notebook, 'numero_serie', linha_notebook,
+                  ['modelo', 'numero_serie', 'processador', 'placa_video', 'memoria_ram', 'armazenamento',
+                   'cor', 'tela', 'sistema_operacional', 'valor', 'data_aquisicao', 'status']),
+}
+
+@dataclass
+class ResultadoImportacao:
+    """Totais da importação e erros por linha da planilha (a linha 1 é o cabeçalho)"""
+    inseridos: int = 0
+    lotes: int = 0
+    erros: list = field(default_factory=list)
+
+def ler_planilha(arquivo, nome):
+    """Linhas da planilha como dicionários, lidas sob demanda; XLSX só com o openpyxl instalado"""
+    if nome.lower().endswith('.xlsx'):
+        if openpyxl is None:
+            raise ValueError('Importação de XLSX requer o pacote openpyxl; envie um CSV')
+        planilha = openpyxl.load_workbook(arquivo, read_only=True, data_only=True).active
+        linhas = planilha.iter_rows(values_only=True)
+        cabecalho = [str(coluna or '').strip().lower() for coluna in next(linhas, ())]
+        for valores in linhas:
+            yield dict(zip(cabecalho, ('' if valor is None else str(valor) for valor in valores)))
+        return
+    
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    primeira = texto.readline()
+    # Planilhas exportadas em português costumam usar ponto e vírgula
+    separador = ';' if primeira.count(';') > primeira.count(',') else ','
+    leitor = csv.reader(chain([primeira], texto), delimiter=separador)
+    cabecalho = [coluna.strip().lower() for coluna in next(leitor, [])]
+    for valores in leitor:
+        yield dict(zip(cabecalho, valores))
+
+def gravar_lote(modelo, chave, pendentes, resultado):
+    """Insere um lote em uma transação, com um único INSERT executemany, pulando chaves já cadastradas"""
+    coluna = getattr(modelo, chave)
+    existentes = set(db.session.scalars(select(coluna).where(coluna.in_([registro[chave] for _, registro in pendentes]))))
+    novos = []
+    for numero, registro in pendentes:
+        if registro[chave] in existentes:
+            resultado.erros.append((numero, f'{chave} já cadastrado: {registro[chave]}'))
+        else:
+            novos.append((numero, registro))
+    if not novos:
+        return
+    
+    registros = [registro for _, registro in novos]
+    try:
+        # INSERT em massa não passa pelo flush: versões e contadores são atualizados aqui
+        db.session.execute(modelo.__table__.insert(), registros)
+        marcar_alteracao(modelo)
+        if modelo is Notebook:
+            totais = {}
+            for registro in registros:
+                totais[registro['status']] = totais.get(registro['status'], 0) + 1
+            somar_contadores(db.session.connection(), NotebookStatusContagem,
+                             [{'status': status, 'total': total} for status, total in totais.items()])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        resultado.erros.extend((numero, f'Lote não gravado: {e}') for numero, _ in novos)
+        return
+    
+    resultado.inseridos += len(registros)
+    resultado.lotes += 1
+
+def importar_registros(tipo, linhas, lote=None):
+    """Valida as linhas e grava em lotes de `lote` linhas, uma transação por lote"""
+    modelo, chave, converter, _ = IMPORTACOES[tipo]
+    lote = lote or app.config['IMPORTACAO_LOTE']
+    resultado = ResultadoImportacao()
+    vistas = set()
+    pendentes = []
+    
+    for numero, campos in enumerate(linhas, start=2):
+        try:
+            registro = converter(campos)
+        except ValueError as e:
+            resultado.erros.append((numero, str(e)))
+            continue
+        if registro[chave] in vistas:
+            resultado.erros.append((numero, f'{chave} repetido no arquivo: {registro[chave]}'))
+            continue
+        vistas.add(registro[chave])
+        pendentes.append((numero, registro))
+        if len(pendentes) >= lote:
+            gravar_lote(modelo, chave, pendentes, resultado)
+            pendentes = []
+    if pendentes:
+        gravar_lote(modelo, chave, pendentes, resultado)
+    
+    resultado.erros.sort()
+    return resultado
+
+@app.route('/importar', methods=['GET', 'POST'])
+def importar():
     if 'usuario_id' not in session:
         return redirect(url_for('login'))
     
-    status = request.args.get('status', 'todos')
+    tipo = request.values.get('tipo', 'clientes')
+    if tipo not in IMPORTACOES:
+        tipo = 'clientes'
     
-    query = Emprestimo.query
+    resultado = None
+    if request.method == 'POST':
+        arquivo = request.files.get('arquivo')
+        if not arquivo or not arquivo.filename:
+            flash('Selecione um arquivo CSV ou XLSX.', 'danger')
+        else:
+            try:
+                resultado = importar_registros(tipo, ler_planilha(arquivo.stream, arquivo.filename))
+                categoria = 'warning' if resultado.erros else 'success'
+                flash(f'{resultado.inseridos} registros importados, {len(resultado.erros)} linhas com erro.', categoria)
+            except (ValueError, UnicodeDecodeError, csv.Error, zipfile.BadZipFile, InvalidFileException) as e:
+                flash(f'Erro ao ler o arquivo: {str(e)}', 'danger')
+    
+    return render_importar(tipo, resultado)
+
+@app.cli.command('importar')
+@click.argument('tipo', type=click.Choice(sorted(IMPORTACOES)))
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--lote', type=int, default=None, help='Linhas por transação (padrão: IMPORTACAO_LOTE)')
+@click.option('--relatorio', type=click.Path(dir_okay=False), default=None, help='CSV com os erros por linha')
+def importar_comando(tipo, arquivo, lote, relatorio):
+    """Importa clientes ou notebooks de um CSV/XLSX em lotes"""
+    inicio = time.perf_counter()
+    with open(arquivo, 'rb') as entrada:
+        resultado = importar_registros(tipo, ler_planilha(entrada, arquivo), lote)
+    duracao = time.perf_counter() - inicio
+    
+    linhas = resultado.inseridos + len(resultado.erros)
+    print(f"✅ {resultado.inseridos} {tipo} importados em {resultado.lotes} lotes "
+          f"({duracao:.1f}s, {linhas / duracao * 60 if duracao else 0:,.0f} linhas/min)")
+    if relatorio:
+        with open(relatorio, 'w', newline='', encoding='utf-8') as saida:
+            escritor = csv.writer(saida)
+            escritor.writerow(['linha', 'erro'])
+            escritor.writerows(resultado.erros)
+    for numero, erro in resultado.erros[:20]:
+        print(f"❌ linha {numero}: {erro}")
+    if len(resultado.erros) > 20:
+        print(f"⚠️ mais {len(resultado.erros) - 20} erros" + (f" em {relatorio}" if relatorio else "; use --relatorio"))
+
+# Exportação do histórico, lida do cursor em blocos e escrita à medida que sai do banco
+def consulta_exportacao_emprestimos(inicio, fim, status):
+    consulta = select(
+        Emprestimo.id,
+        Cliente.nome.label('cliente'),
+        Cliente.cpf_cnpj,
+        Notebook.modelo.label('notebook'),
+        Notebook.numero_serie,
+        Usuario.nome.label('responsavel'),
+        Emprestimo.data_emprestimo,
+        Emprestimo.data_devolucao_prevista,
+        Emprestimo.data_devolucao_real,
+        Emprestimo.status,
+        Emprestimo.observacoes,
+    ).join(Cliente, Cliente.id == Emprestimo.cliente_id)\
+        .join(Notebook, Notebook.id == Emprestimo.notebook_id)\
+        .join(Usuario, Usuario.id == Emprestimo.usuario_id)\
+        .order_by(Emprestimo.data_emprestimo, Emprestimo.id)
+    if inicio:
+        consulta = consulta.where(Emprestimo.data_emprestimo >= inicio)
+    if fim:
+        consulta = consulta.where(Emprestimo.data_emprestimo < fim)
+    return filtrar_emprestimos(consulta, status)
+
+def consulta_exportacao_comodatos(inicio, fim, status):
+    consulta = select(*(coluna for coluna in Comodato.__table__.columns if coluna.name != 'versao'))\
+        .order_by(Comodato.data_criacao, Comodato.id)
+    if inicio:
+        consulta = consulta.where(Comodato.data_criacao >= inicio)
+    if fim:
+        consulta = consulta.where(Comodato.data_criacao < fim)
+    return consulta
+
+# Por tipo: (consulta com os filtros, aceita filtro de status)
+EXPORTACOES = {
+    'emprestimos': (consulta_exportacao_emprestimos, True),
+    'comodatos': (consulta_exportacao_comodatos, False),
+}
+
+def filtros_exportacao(tipo, inicio, fim, status):
+    """Valida os filtros; as datas são AAAA-MM-DD e o fim entra no intervalo"""
+    if tipo not in EXPORTACOES:
+        raise ValueError(f'Exportação desconhecida: {tipo}')
+    try:
+        inicio = datetime.strptime(inicio, '%Y-%m-%d') if inicio else None
+        fim = datetime.strptime(fim, '%Y-%m-%d') + timedelta(days=1) if fim else None
+    except ValueError:
+        raise ValueError('Datas devem estar no formato AAAA-MM-DD')
+    except OverflowError:
+        raise ValueError('Data final fora do intervalo aceito')
+    if status not in ('todos', 'ativos', 'atrasados', 'finalizados'):
+        raise ValueError(f'Status inválido: {status}')
+    if status != 'todos' and not EXPORTACOES[tipo][1]:
+        raise ValueError(f'{tipo.title()} não têm filtro de status')
+    return inicio, fim, status
+
+def blocos_exportacao(tipo, inicio=None, fim=None, status='todos'):
+    """(colunas, blocos de linhas) da exportação, lidos do cursor com yield_per"""
+    consulta = EXPORTACOES[tipo][0](inicio, fim, status)
+    resultado = db.session.execute(consulta.execution_options(yield_per=app.config['EXPORTACAO_LOTE']))
+    return consulta.selected_columns, resultado.partitions()
+
+def gerar_csv(colunas, blocos):
+    """CSV em UTF-8 com BOM (para o Excel reconhecer os acentos), um pedaço por bloco de linhas"""
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    saida.write('\ufeff')
+    escritor.writerow([coluna.name for coluna in colunas])
+    for linhas in blocos:
+        escritor.writerows(linhas)
+        yield saida.getvalue().encode('utf-8')
+        saida.seek(0)
+        saida.truncate()
+    if saida.tell():
+        yield saida.getvalue().encode('utf-8')
+
+class SaidaParquet:
+    """Arquivo só de escrita que entrega os bytes já gravados a cada row group"""
+    
+    def __init__(self):
+        self.partes = []
+        self.posicao = 0
+        self.closed = False
+    
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        self.posicao += len(dados)
+        return len(dados)
+    
+    def tell(self):
+        return self.posicao
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def esvaziar(self):
+        dados = b''.join(self.partes)
+        self.partes = []
+        return dados
+
+def tipo_arrow(coluna):
+    if isinstance(coluna.type, db.Integer):
+        return pyarrow.int64()
+    if isinstance(coluna.type, db.Float):
+        return pyarrow.float64()
+    if isinstance(coluna.type, db.DateTime):
+        return pyarrow.timestamp('us')
+    return pyarrow.string()
+
+def gerar_parquet(colunas, blocos):
+    """Parquet com um row group por bloco de linhas; a memória não cresce com o total exportado"""
+    schema = pyarrow.schema([(coluna.name, tipo_arrow(coluna)) for coluna in colunas])
+    saida = SaidaParquet()
+    with pyarrow.parquet.ParquetWriter(saida, schema, compression='zstd') as escritor:
+        for linhas in blocos:
+            valores = list(zip(*linhas))
+            escritor.write_batch(pyarrow.record_batch(
+                [pyarrow.array(coluna, type=campo.type) for coluna, campo in zip(valores, schema)], schema=schema))
+            yield saida.esvaziar()
+    yield saida.esvaziar()
+
+# Por formato: (gerador, mimetype)
+FORMATOS_EXPORTACAO = {
+    'csv': (gerar_csv, 'text/csv'),
+    'parquet': (gerar_parquet, 'application/vnd.apache.parquet'),
+}
+
+def formato_exportacao(formato):
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f'Formato desconhecido: {formato} (use csv ou parquet)')
+    if formato == 'parquet' and pyarrow is None:
+        raise ValueError('Exportação em Parquet requer o pacote pyarrow; use CSV')
+    return FORMATOS_EXPORTACAO[formato]
+
+@app.route('/exportar/<tipo>')
+def exportar(tipo):
+    if 'usuario_id' not in session:
+        return redirect(url_for('login'))
     
+    formato = request.args.get('formato', 'csv')
+    try:
+        gerar, mimetype = formato_exportacao(formato)
+        filtros = filtros_exportacao(tipo, request.args.get('inicio'), request.args.get('fim'),
+                                     request.args.get('status', 'todos'))
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    
+    colunas, blocos = blocos_exportacao(tipo, *filtros)
+    resposta = Response(stream_with_context(gerar(colunas, blocos)), mimetype=mimetype)
+    resposta.headers['Content-Disposition'] = f'attachment; filename={tipo}_{datetime.now():%Y%m%d_%H%M}.{formato}'
+    resposta.cache_control.private = True
+    resposta.cache_control.no_store = True
+    return resposta
+
+@app.cli.command('exportar')
+@click.argument('tipo', type=click.Choice(sorted(EXPORTACOES)))
+@click.argument('arquivo', type=click.Path(dir_okay=False))
+@click.option('--formato', type=click.Choice(sorted(FORMATOS_EXPORTACAO)), default=None,
+              help='Padrão: pela extensão do arquivo')
+@click.option('--inicio', default=None, help='Data inicial, AAAA-MM-DD')
+@click.option('--fim', default=None, help='Data final (inclusive), AAAA-MM-DD')
+@click.option('--status', default='todos', type=click.Choice(['todos', 'ativos', 'atrasados', 'finalizados']))
+def exportar_comando(tipo, arquivo, formato, inicio, fim, status):
+    """Exporta empréstimos ou comodatos em CSV ou Parquet, sem carregar tudo na memória"""
+    formato = formato or ('parquet' if arquivo.endswith('.parquet') else 'csv')
+    try:
+        gerar, _ = formato_exportacao(formato)
+        filtros = filtros_exportacao(tipo, inicio, fim, status)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    
+    inicio_exportacao = time.perf_counter()
+    colunas, blocos = blocos_exportacao(tipo, *filtros)
+    contados = []
+    
+    def contar(blocos):
+        for linhas in blocos:
+            contados.append(len(linhas))
+            yield linhas
+    
+    with open(arquivo, 'wb') as saida:
+        for parte in gerar(colunas, contar(blocos)):
+            saida.write(parte)
+    print(f"✅ {sum(contados)} {tipo} exportados em {arquivo} "
+          f"({os.path.getsize(arquivo):,} B, {time.perf_counter() - inicio_exportacao:.1f}s)")
+
+def filtrar_emprestimos(query, status):
+    """Aplica o filtro de status da listagem à query de empréstimos"""
     if status == 'ativos':
-        query = query.filter_by(status='ativo')
+        query = query.filter(Emprestimo.status == 'ativo')
     elif status == 'finalizados':
-        query = query.filter_by(status='finalizado')
+        query = query.filter(Emprestimo.status == 'finalizado')
     elif status == 'atrasados':
-        query = query.filter(
-            Emprestimo.status == 'ativo',
-            Emprestimo.data_devolucao_prevista < datetime.now()
-        )
+        query = query.filter(Emprestimo.atrasado == true())
+    
+    return query
+
+# Empréstimos contados em cada cartão da listagem, por filtro de status
+FILTROS_CONTAGEM_EMPRESTIMOS = {
+    'ativos': lambda status, atrasado: status == 'ativo',
+    'finalizados': lambda status, atrasado: status == 'finalizado',
+    'atrasados': lambda status, atrasado: atrasado,
+}
+
+def estatisticas_emprestimos(filtro):
+    """Contadores da listagem somados da tabela de contagem; custo independente do histórico"""
+    passa = FILTROS_CONTAGEM_EMPRESTIMOS.get(filtro, lambda status, atrasado: True)
+    estatisticas = {'total': 0, 'ativos': 0, 'atrasados': 0, 'finalizados': 0}
+    for linha in EmprestimoStatusContagem.query.filter(EmprestimoStatusContagem.total != 0):
+        if not passa(linha.status, linha.atrasado):
+            continue
+        estatisticas['total'] += linha.total
+        if linha.status == 'ativo':
+            estatisticas['ativos'] += linha.total
+        elif linha.status == 'finalizado':
+            estatisticas['finalizados'] += linha.total
+        if linha.atrasado:
+            estatisticas['atrasados'] += linha.total
+    return estatisticas
+
+def paginar_emprestimos(status, limite):
+    """Página de empréstimos a partir dos cursores 'apos'/'antes' da URL"""
+    return paginar_keyset(
+        filtrar_emprestimos(consulta_lista('emprestimos'), status),
+        Emprestimo.data_emprestimo,
+        Emprestimo.id,
+        limite,
+        apos=decodificar_cursor(request.args.get('apos')),
+        antes=decodificar_cursor(request.args.get('antes')),
+    )
+
+def emprestimo_para_dict(emp):
+    return {
+        'id': emp.id,
+        'cliente': {'id': emp.cliente.id, 'nome': emp.cliente.nome, 'cpf_cnpj': emp.cliente.cpf_cnpj},
+        'notebook': {'id': emp.notebook.id, 'modelo': emp.notebook.modelo, 'numero_serie': emp.notebook.numero_serie},
+        'responsavel': emp.usuario.nome,
+        'data_emprestimo': emp.data_emprestimo.isoformat(),
+        'data_devolucao_prevista': emp.data_devolucao_prevista.isoformat(),
+        'data_devolucao_real': emp.data_devolucao_real.isoformat() if emp.data_devolucao_real else None,
+        'status': emp.status,
+        'atrasado': emp.atrasado,
+    }
+
+@app.route('/emprestimos')
+def emprestimos():
+    if 'usuario_id' not in session:
+        return redirect(url_for('login'))
+    
+    status = request.args.get('status', 'todos')
+    limite = obter_limite(app.config['EMPRESTIMOS_POR_PAGINA'])
+    
+    pagina = paginar_emprestimos(status, limite)
+    estatisticas = estatisticas_emprestimos(status)
     
-    emprestimos = query.order_by(Emprestimo.data_emprestimo.desc()).all()
-    return render_emprestimos(emprestimos, status)
+    return render_emprestimos(
+        pagina['itens'], status, estatisticas,
+        pagina['proximo'], pagina['anterior'],
+        limite if limite != app.config['EMPRESTIMOS_POR_PAGINA'] else None
+    )
+
+@app.route('/api/emprestimos')
+def api_emprestimos():
+    if 'usuario_id' not in session:
+        return jsonify({'erro': 'Não autenticado'}), 401
+    
+    status = request.args.get('status', 'todos')
+    limite = obter_limite(app.config['EMPRESTIMOS_POR_PAGINA'])
+    
+    pagina = paginar_emprestimos(status, limite)
+    
+    return jsonify({
+        'emprestimos': [emprestimo_para_dict(emp) for emp in pagina['itens']],
+        'limite': limite,
+        'proximo': pagina['proximo'],
+        'anterior': pagina['anterior'],
+    })
 
 @app.route('/emprestimos/novo', methods=['GET', 'POST'])
 def novo_emprestimo():
@@ -2583,9 +2457,19 @@ def novo_emprestimo():
                 data_devolucao_prevista=datetime.strptime(request.form['data_devolucao_prevista'], '%Y-%m-%d'),
                 observacoes=request.form['observacoes']
             )
+            # Prevista no passado já nasce atrasado, sem esperar a próxima rodada do verificador
+            if emprestimo.data_devolucao_prevista < datetime.now():
+                emprestimo.atrasado = True
+                emprestimo.atrasado_em = datetime.now()
+            
+            # As opções chegam pelo autocompletar e podem estar desatualizadas
+            if db.session.get(Cliente, emprestimo.cliente_id) is None:
+                raise ValueError('cliente não encontrado')
+            notebook = db.session.get(Notebook, emprestimo.notebook_id)
+            if notebook is None or notebook.status != 'disponivel':
+                raise ValueError('notebook não está mais disponível')
             
             # Atualizar status do notebook
-            notebook = Notebook.query.get(int(request.form['notebook_id']))
             notebook.status = 'emprestado'
             
             db.session.add(emprestimo)
@@ -2597,9 +2481,7 @@ def novo_emprestimo():
         except Exception as e:
             flash(f'Erro ao realizar empréstimo: {str(e)}', 'danger')
     
-    clientes = Cliente.query.all()
-    notebooks = Notebook.query.filter_by(status='disponivel').all()
-    return render_form_emprestimo(clientes, notebooks)
+    return render_form_emprestimo()
 
 @app.route('/emprestimos/<int:id>/devolver', methods=['POST'])
 def devolver_emprestimo(id):
@@ -2610,6 +2492,7 @@ def devolver_emprestimo(id):
         emprestimo = Emprestimo.query.get_or_404(id)
         emprestimo.status = 'finalizado'
         emprestimo.data_devolucao_real = datetime.now()
+        emprestimo.atrasado = False  # atrasado_em fica como histórico
         
         # Liberar notebook
         notebook = Notebook.query.get(emprestimo.notebook_id)
@@ -2630,8 +2513,20 @@ def comodatos():
     if 'usuario_id' not in session:
         return redirect(url_for('login'))
     
-    comodatos = Comodato.query.all()
-    return render_comodatos(comodatos)
+    etag = etag_pagina('comodatos', Comodato)
+    if request.if_none_match.contains_weak(etag):
+        return com_etag(Response(status=304), etag)
+    
+    comodatos = consulta_lista('comodatos').yield_per(app.config['LINHAS_POR_BLOCO'])
+    
+    total, unidades, valor_total = db.session.query(
+        func.count(Comodato.id),
+        func.coalesce(func.sum(Comodato.quantidade), 0),
+        func.coalesce(func.sum(Comodato.valor_total), 0)
+    ).one()
+    estatisticas = {'total': total, 'unidades': unidades, 'valor_total': valor_total}
+    
+    return com_etag(render_comodatos(comodatos, estatisticas), etag)
 
 @app.route('/comodatos/novo', methods=['GET', 'POST'])
 def novo_comodato():
@@ -2667,27 +2562,279 @@ def novo_comodato():
     
     return render_form_comodato()
 
+# Busca textual (FTS5) em clientes, notebooks e comodatos. Uma única tabela
+# virtual; o rowid codifica a origem (id * BUSCA_TIPOS + tipo) para que os
+# gatilhos removam a linha antiga pela chave, sem varrer o índice
+BUSCA_TIPOS = 4
+
+def somente_digitos_sql(coluna):
+    return f"replace(replace(replace({coluna}, '.', ''), '-', ''), '/', '')"
+
+# Por tabela: (tipo no rowid, rótulo, colunas indexadas, título, detalhes, chaves só com dígitos)
+BUSCA_FONTES = {
+    'cliente': (1, 'Cliente', ['nome', 'cpf_cnpj', 'email'],
+                "{0}.nome",
+                "{0}.cpf_cnpj || coalesce(' · ' || {0}.email, '')",
+                somente_digitos_sql('{0}.cpf_cnpj')),
+    'notebook': (2, 'Notebook', ['modelo', 'numero_serie', 'processador', 'placa_video'],
+                 "{0}.modelo",
+                 "coalesce({0}.numero_serie, '') || coalesce(' · ' || {0}.processador, '')"
+                 " || coalesce(' · ' || {0}.placa_video, '')",
+                 "''"),
+    'comodato': (3, 'Comodato', ['crm', 'razao_social', 'cnpj', 'destino'],
+                 "{0}.razao_social",
+                 "'CRM ' || {0}.crm || ' · ' || {0}.cnpj || ' · ' || {0}.destino",
+                 somente_digitos_sql('{0}.cnpj')),
+}
+BUSCA_PAGINAS = {'cliente': '/clientes', 'notebook': '/notebooks', 'comodato': '/comodatos'}
+
+def ddl_busca():
+    """Tabela virtual e gatilhos que a mantêm igual às tabelas de origem"""
+    comandos = [
+        # prefix: índices extras para as buscas pelo início da palavra ("avel*")
+        "CREATE VIRTUAL TABLE IF NOT EXISTS busca_fts USING fts5("
+        "titulo, detalhes, chaves, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    ]
+    for tabela, (tipo, _, colunas, titulo, detalhes, chaves) in BUSCA_FONTES.items():
+        inserir = (f"INSERT INTO busca_fts (rowid, titulo, detalhes, chaves) VALUES "
+                   f"(NEW.id * {BUSCA_TIPOS} + {tipo}, {titulo.format('NEW')}, "
+                   f"{detalhes.format('NEW')}, {chaves.format('NEW')});")
+        remover = f"DELETE FROM busca_fts WHERE rowid = OLD.id * {BUSCA_TIPOS} + {tipo};"
+        comandos += [
+            f"CREATE TRIGGER IF NOT EXISTS busca_{tabela}_insert AFTER INSERT ON {tabela} BEGIN {inserir} END",
+            f"CREATE TRIGGER IF NOT EXISTS busca_{tabela}_delete AFTER DELETE ON {tabela} BEGIN {remover} END",
+            # Só as colunas indexadas: mudar o status do notebook não reescreve o índice
+            f"CREATE TRIGGER IF NOT EXISTS busca_{tabela}_update AFTER UPDATE OF {', '.join(colunas)} "
+            f"ON {tabela} BEGIN {remover} {inserir} END",
+        ]
+    return comandos
+
+def criar_busca():
+    with db.engine.begin() as conexao:
+        for comando in ddl_busca():
+            conexao.execute(text(comando))
+
+@lru_cache(maxsize=None)
+def busca_disponivel():
+    """Se a tabela da busca existe; o SQLite compilado sem FTS5 não consegue criá-la"""
+    return db.session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'busca_fts'"
+    )).first() is not None
+
+def reconstruir_busca():
+    """Recria o conteúdo da busca a partir das tabelas de origem"""
+    with db.engine.begin() as conexao:
+        conexao.execute(text("DELETE FROM busca_fts"))
+        for tabela, (tipo, _, _, titulo, detalhes, chaves) in BUSCA_FONTES.items():
+            conexao.execute(text(
+                f"INSERT INTO busca_fts (rowid, titulo, detalhes, chaves) "
+                f"SELECT id * {BUSCA_TIPOS} + {tipo}, {titulo.format(tabela)}, "
+                f"{detalhes.format(tabela)}, {chaves.format(tabela)} FROM {tabela}"
+            ))
+        conexao.execute(text("INSERT INTO busca_fts (busca_fts) VALUES ('optimize')"))
+        return conexao.execute(text("SELECT count(*) FROM busca_fts")).scalar()
+
+@app.cli.command('reconstruir-busca')
+def reconstruir_busca_comando():
+    """Recria o índice de busca textual a partir de clientes, notebooks e comodatos"""
+    if not busca_disponivel():
+        print("⚠️ Busca indisponível: o SQLite deste ambiente não tem FTS5")
+        return
+    total = reconstruir_busca()
+    print(f"✅ Índice de busca reconstruído: {total} registros")
+
+def expressao_busca(termo):
+    """Cada palavra vira um termo entre aspas (sem operadores do FTS5); a última também casa por prefixo"""
+    palavras = re.findall(r'\w+', termo)
+    if not palavras:
+        return None
+    expressao = ' '.join(f'"{palavra}"' for palavra in palavras)
+    # Prefixo de uma letra não tem índice próprio e percorreria quase todo o vocabulário
+    return expressao + '*' if len(palavras[-1]) > 1 else expressao
+
+@dataclass
+class ResultadoBusca:
+    """Resultados da busca; por_relevancia é falso quando o termo casou com linhas demais para ordenar"""
+    resultados: list = field(default_factory=list)
+    por_relevancia: bool = True
+
+def buscar(termo, tipo=None, limite=None):
+    """Resultados ordenados por relevância (bm25, com o título pesando mais que os detalhes).
+
+    O bm25 lê a lista inteira de documentos de cada termo, o que custa caro
+    para termos que aparecem em milhões de linhas. Primeiro as correspondências
+    mais recentes são lidas só pelo rowid, até BUSCA_CANDIDATOS; se houver
+    mais que isso, a busca é ampla demais e volta pela data de cadastro.
+    """
+    expressao = expressao_busca(termo)
+    if expressao is None:
+        return ResultadoBusca()
+    limite = limite or app.config['BUSCA_LIMITE']
+    filtro = ''
+    parametros = {'expressao': expressao, 'candidatos': app.config['BUSCA_CANDIDATOS'], 'limite': limite}
+    if tipo in BUSCA_FONTES:
+        filtro = f"AND rowid % {BUSCA_TIPOS} = :tipo"
+        parametros['tipo'] = BUSCA_FONTES[tipo][0]
+    
+    rowids = db.session.execute(text(
+        f"SELECT rowid FROM busca_fts WHERE busca_fts MATCH :expressao {filtro} "
+        f"ORDER BY rowid DESC LIMIT :candidatos"
+    ), parametros).scalars().all()
+    por_relevancia = len(rowids) < app.config['BUSCA_CANDIDATOS']
+    if por_relevancia:
+        linhas = db.session.execute(text(
+            f"SELECT rowid, titulo, detalhes FROM busca_fts WHERE busca_fts MATCH :expressao {filtro} "
+            f"ORDER BY bm25(busca_fts, 10.0, 2.0, 5.0) LIMIT :limite"
+        ), parametros).all()
+    else:
+        recentes = rowids[:limite]
+        linhas = db.session.execute(
+            text("SELECT rowid, titulo, detalhes FROM busca_fts WHERE rowid IN :rowids ORDER BY rowid DESC")
+            .bindparams(bindparam('rowids', expanding=True)), {'rowids': recentes}
+        ).all()
+    
+    tabelas = {tipo: tabela for tabela, (tipo, *_) in BUSCA_FONTES.items()}
+    resultados = []
+    for rowid, titulo, detalhes in linhas:
+        tabela = tabelas[rowid % BUSCA_TIPOS]
+        resultados.append({
+            'tipo': tabela,
+            'rotulo': BUSCA_FONTES[tabela][1],
+            'id': rowid // BUSCA_TIPOS,
+            'titulo': titulo,
+            'detalhes': detalhes,
+            'url': BUSCA_PAGINAS[tabela],
+        })
+    return ResultadoBusca(resultados, por_relevancia)
+
+@app.route('/busca')
+def busca():
+    if 'usuario_id' not in session:
+        return redirect(url_for('login'))
+    
+    termo = request.args.get('q', '').strip()
+    tipo = request.args.get('tipo')
+    if termo and not busca_disponivel():
+        return render_busca(termo, tipo, indisponivel=True), 503
+    inicio = time.perf_counter()
+    resultado = buscar(termo, tipo) if termo else ResultadoBusca()
+    return render_busca(termo, tipo, resultado, (time.perf_counter() - inicio) * 1000)
+
+@app.route('/api/busca')
+def api_busca():
+    if 'usuario_id' not in session:
+        return jsonify({'erro': 'Não autenticado'}), 401
+    if not busca_disponivel():
+        return jsonify({'erro': 'Busca indisponível'}), 503
+    
+    limite = obter_limite(app.config['BUSCA_LIMITE'])
+    return jsonify(asdict(buscar(request.args.get('q', ''), request.args.get('tipo'), limite)))
+
+# Autocompletar do formulário de empréstimo, sobre o mesmo índice da busca.
+# Por lista: (modelo, fonte na busca, texto da opção, condição extra)
+SUGESTOES = {
+    'clientes': (Cliente, 'cliente', "cliente.nome || ' - ' || cliente.cpf_cnpj", ""),
+    'notebooks': (Notebook, 'notebook', "notebook.modelo || ' - ' || notebook.numero_serie",
+                  "AND notebook.status = 'disponivel'"),
+}
+
+def sugerir(lista, termo, limite):
+    """Opções cujo texto começa pelo termo digitado, das cadastradas mais recentemente para as mais antigas"""
+    expressao = expressao_busca(termo)
+    if expressao is None:
+        return []
+    modelo, fonte, texto, condicao = SUGESTOES[lista]
+    tabela = modelo.__tablename__
+    # O índice entrega os rowids já em ordem decrescente; a leitura para no limite
+    linhas = db.session.execute(text(
+        f"SELECT {tabela}.id, {texto} FROM busca_fts "
+        f"JOIN {tabela} ON {tabela}.id = busca_fts.rowid / {BUSCA_TIPOS} "
+        f"WHERE busca_fts MATCH :expressao AND busca_fts.rowid % {BUSCA_TIPOS} = :tipo {condicao} "
+        f"ORDER BY busca_fts.rowid DESC LIMIT :limite"
+    ), {'expressao': expressao, 'tipo': BUSCA_FONTES[fonte][0], 'limite': limite}).all()
+    return [{'id': id, 'texto': texto} for id, texto in linhas]
+
+@app.route('/api/sugestoes/<lista>')
+def api_sugestoes(lista):
+    if 'usuario_id' not in session:
+        return jsonify({'erro': 'Não autenticado'}), 401
+    if lista not in SUGESTOES:
+        return jsonify({'erro': 'Lista desconhecida'}), 404
+    if not busca_disponivel():
+        return jsonify({'erro': 'Busca indisponível'}), 503
+    
+    termo = request.args.get('q', '').strip()
+    limite = obter_limite(app.config['SUGESTOES_LIMITE'])
+    # Muda a cada escrita na tabela: o navegador revalida e recebe 304 enquanto nada mudou
+    etag = etag_pagina(f'sugestoes|{lista}|{limite}|{termo}', SUGESTOES[lista][0])
+    if request.if_none_match.contains_weak(etag):
+        return com_etag(Response(status=304), etag)
+    
+    return com_etag(jsonify({'sugestoes': sugerir(lista, termo, limite)}), etag)
+
 @app.route('/relatorios')
 def relatorios():
     if 'usuario_id' not in session:
         return redirect(url_for('login'))
     
-    # Dados para relatórios
-    emprestimos_mes = Emprestimo.query.filter(
-        Emprestimo.data_emprestimo >= datetime.now().replace(day=1)
-    ).count()
-    
-    clientes_ativos = db.session.query(Emprestimo.cliente_id)\
-        .filter(Emprestimo.status == 'ativo')\
-        .distinct()\
-        .count()
+    # Só a estrutura da página; os números vêm de /api/metrics/relatorios
+    etag = etag_pagina('relatorios')
+    if request.if_none_match.contains_weak(etag):
+        return com_etag(Response(status=304), etag)
+    
+    return com_etag(render_relatorios(), etag)
+
+# Métricas carregadas pelos gráficos depois que a página abre: (cálculo, tabelas lidas)
+METRICAS = {
+    'dashboard': {
+        'kpis': (lambda: asdict(kpis_em_cache()), (Cliente, Notebook, Emprestimo, Comodato)),
+        'serie': (lambda: serie_mensal(6), (Emprestimo,)),
+    },
+    'relatorios': {
+        'kpis': (lambda: asdict(kpis_em_cache()), (Cliente, Notebook, Emprestimo, Comodato)),
+        'serie': (lambda: serie_mensal(12), (Emprestimo,)),
+        'status_notebooks': (distribuicao_status_notebooks, (Notebook,)),
+    },
+}
+
+@app.route('/api/metrics/<pagina>')
+@app.route('/api/metrics/<pagina>/<metrica>')
+def api_metricas(pagina, metrica=None):
+    """Métricas de uma página, todas juntas ou uma por vez, com ETag pelas versões das tabelas"""
+    if 'usuario_id' not in session:
+        return jsonify({'erro': 'Não autenticado'}), 401
     
-    notebooks_emprestados = Notebook.query.filter_by(status='emprestado').count()
+    metricas = METRICAS.get(pagina, {})
+    if metrica is not None:
+        metricas = {metrica: metricas[metrica]} if metrica in metricas else {}
+    if not metricas:
+        return jsonify({'erro': 'Métrica não encontrada'}), 404
     
-    total_comodatos = Comodato.query.count()
-    valor_total_comodatos = sum(c.valor_total for c in Comodato.query.all())
+    modelos = dict.fromkeys(chain.from_iterable(modelos for _, modelos in metricas.values()))
+    etag = etag_pagina(f'metricas/{pagina}/{metrica or ""}', *modelos)
+    if request.if_none_match.contains_weak(etag):
+        return com_etag(Response(status=304), etag)
     
-    return render_relatorios(emprestimos_mes, clientes_ativos, notebooks_emprestados, total_comodatos, valor_total_comodatos)
+    dados = {nome: calcular() for nome, (calcular, _) in metricas.items()}
+    return com_etag(jsonify(dados[metrica] if metrica else dados), etag)
+
+@app.route('/api/cache')
+def api_cache():
+    """Acertos e faltas dos caches deste worker, para ajuste de TTL e limites"""
+    if 'usuario_id' not in session:
+        return jsonify({'erro': 'Não autenticado'}), 401
+    if session.get('usuario_email') != 'admin':
+        return jsonify({'erro': 'Acesso não autorizado'}), 403
+    
+    return jsonify({
+        'resultados': cache_resultados.estatisticas(),
+        'fragmentos': {
+            'acertos': fragmentos.acertos,
+            'faltas': fragmentos.faltas,
+            'itens': len(fragmentos.itens),
+            'memoria': fragmentos.ocupado,
+        },
+    })
 
 @app.route('/usuarios')
 def usuarios():
@@ -2699,7 +2846,7 @@ def usuarios():
         flash('Acesso não autorizado!', 'danger')
         return redirect(url_for('dashboard'))
     
-    usuarios = Usuario.query.all()
+    usuarios = consulta_lista('usuarios').yield_per(app.config['LINHAS_POR_BLOCO'])
     return render_usuarios(usuarios)
 
 @app.route('/usuarios', methods=['POST'])
@@ -2823,6 +2970,169 @@ def ativar_usuario(id):
     
     return redirect(url_for('usuarios'))
 
+# Consultas mais frequentes; nenhuma pode varrer a tabela inteira
+def consultas_criticas():
+    agora = datetime.now()
+    cursor = (agora, 0)
+    return {
+        'listagem': filtrar_emprestimos(Emprestimo.query, 'todos')
+            .order_by(Emprestimo.data_emprestimo.desc(), Emprestimo.id.desc()).limit(51),
+        'listagem_pagina_seguinte': paginar_keyset_query(
+            filtrar_emprestimos(Emprestimo.query, 'todos'), Emprestimo.data_emprestimo, Emprestimo.id, 50, apos=cursor),
+        'listagem_ativos': paginar_keyset_query(
+            filtrar_emprestimos(Emprestimo.query, 'ativos'), Emprestimo.data_emprestimo, Emprestimo.id, 50, apos=cursor),
+        'listagem_atrasados': paginar_keyset_query(
+            filtrar_emprestimos(Emprestimo.query, 'atrasados'), Emprestimo.data_emprestimo, Emprestimo.id, 50),
+        'atrasados': Emprestimo.query.filter(Emprestimo.atrasado == true()),
+        'marcar_atrasados': Emprestimo.query.filter(
+            Emprestimo.status == 'ativo', Emprestimo.atrasado == false(), Emprestimo.data_devolucao_prevista < agora),
+        'proximas_devolucoes': Emprestimo.query.filter_by(status='ativo')
+            .order_by(Emprestimo.data_devolucao_prevista.asc()).limit(5),
+        'emprestimos_do_cliente': Emprestimo.query.filter_by(cliente_id=1),
+        'emprestimos_do_notebook': Emprestimo.query.filter_by(notebook_id=1),
+        'notebooks_emprestados': Notebook.query.filter_by(status='emprestado')
+            .with_entities(func.count(Notebook.id)),
+        'estatisticas_emprestimos': EmprestimoStatusContagem.query.filter(EmprestimoStatusContagem.total != 0),
+    }
+
+# Tabelas de contadores: uma linha por status ou mês, podem ser lidas inteiras
+TABELAS_CONTADORES = {EmprestimoMensal.__tablename__, NotebookStatusContagem.__tablename__,
+                      EmprestimoStatusContagem.__tablename__}
+
+def verificar_planos(consultas):
+    """Roda EXPLAIN QUERY PLAN e retorna as consultas que caem em varredura completa"""
+    problemas = {}
+    for nome, query in consultas.items():
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plano = [linha[3] for linha in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+        if any(p.startswith('SCAN') and 'USING' not in p and p.split()[1] not in TABELAS_CONTADORES for p in plano):
+            problemas[nome] = plano
+    return problemas
+
+@app.cli.command('verificar-indices')
+def verificar_indices():
+    """Falha se alguma consulta crítica deixar de usar índice"""
+    problemas = verificar_planos(consultas_criticas())
+    for nome, plano in problemas.items():
+        print(f"❌ {nome}: {' | '.join(plano)}")
+    if problemas:
+        raise SystemExit(1)
+    print("✅ Todas as consultas críticas usam índices")
+
+# Páginas de listagem: o número de comandos SQL de cada uma não pode crescer com os registros
+PAGINAS_LISTAGEM = ['/dashboard', '/clientes', '/notebooks', '/emprestimos', '/emprestimos?status=ativos',
+                    '/emprestimos?status=atrasados', '/emprestimos?status=finalizados', '/api/emprestimos',
+                    '/comodatos', '/usuarios', '/relatorios', '/busca?q=cliente']
+
+def semear_listagens(inicio, fim, usuario_id):
+    """Cadastra clientes, notebooks, empréstimos e comodatos numerados de inicio a fim - 1"""
+    agora = datetime.now()
+    for i in range(inicio, fim):
+        cliente = Cliente(nome=f'Cliente {i}', cpf_cnpj=f'{i:011d}', email=f'cliente{i}@exemplo.com')
+        notebook = Notebook(modelo=f'Avell {i % 3}', numero_serie=f'SN{i:06d}', valor=1000.0 + i,
+                            status='emprestado' if i % 2 else 'disponivel')
+        db.session.add_all([cliente, notebook])
+        db.session.add(Emprestimo(cliente=cliente, notebook=notebook, usuario_id=usuario_id,
+                                  data_emprestimo=agora - timedelta(days=i),
+                                  data_devolucao_prevista=agora + timedelta(days=5 - i),
+                                  status='ativo' if i % 2 else 'finalizado', atrasado=i % 2 == 1 and i > 5))
+        db.session.add(Comodato(crm=f'CRM{i:06d}', razao_social=f'Empresa {i}', cnpj=f'{i:014d}', destino='SP',
+                                modelo=f'Avell {i % 3}', quantidade=2, valor_unitario=10.0, valor_total=20.0))
+        usuario = Usuario(nome=f'Usuário {i}', email=f'usuario{i}@exemplo.com')
+        usuario.set_senha(f'senha{i}')
+        db.session.add(usuario)
+    db.session.commit()
+
+def contar_comandos_listagens(cliente):
+    """Comandos SQL enviados ao banco por página de listagem"""
+    comandos = []
+    
+    def contar(*args):
+        comandos.append(args[2])
+    
+    contagens = {}
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        for pagina in PAGINAS_LISTAGEM:
+            db.session.remove()  # cada página com a sessão vazia, como em uma requisição nova
+            comandos.clear()
+            resposta = cliente.get(pagina)
+            resposta.get_data()
+            if resposta.status_code != 200:
+                raise click.ClickException(f'{pagina} respondeu {resposta.status_code}')
+            contagens[pagina] = len(comandos)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return contagens
+
+@app.cli.command('contar-consultas')
+@click.option('--linhas', type=int, default=10, help='Registros de cada tabela na primeira medição; a segunda usa o triplo')
+def contar_consultas_comando(linhas):
+    """Falha se alguma listagem fizer mais comandos SQL com mais registros (consultas N+1)"""
+    if any(modelo.query.first() is not None for modelo in (Cliente, Notebook, Emprestimo, Comodato)):
+        print("⚠️ O comando cadastra registros de teste; rode em um banco vazio:")
+        print("💡 AVELL_DATABASE_URL=sqlite:// flask --app app contar-consultas")
+        raise SystemExit(1)
+    # O verificador de atrasos escreveria no banco no meio da contagem
+    verificador_atrasos.intervalo = 0
+    admin = Usuario.query.filter_by(email='admin').first()
+    admin_id = admin.id  # a sessão é descartada a cada página medida
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao.update(usuario_id=admin.id, usuario_nome=admin.nome,
+                      usuario_permissao=admin.permissao, usuario_email=admin.email)
+    
+    semear_listagens(0, linhas, admin_id)
+    antes = contar_comandos_listagens(cliente)
+    semear_listagens(linhas, linhas * 3, admin_id)
+    depois = contar_comandos_listagens(cliente)
+    
+    cresceram = [pagina for pagina in PAGINAS_LISTAGEM if depois[pagina] > antes[pagina]]
+    for pagina in PAGINAS_LISTAGEM:
+        print(f"{'❌' if pagina in cresceram else '✅'} {pagina}: {antes[pagina]} comandos com {linhas} "
+              f"registros, {depois[pagina]} com {linhas * 3}")
+    if cresceram:
+        raise SystemExit(1)
+    print("✅ Nenhuma listagem cresce com os registros")
+
+def adicionar_colunas():
+    """Acrescenta em bancos já existentes as colunas declaradas depois da criação da tabela"""
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conexao:
+        for tabela in db.metadata.sorted_tables:
+            existentes = {coluna['name'] for coluna in inspector.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name in existentes:
+                    continue
+                definicao = f'{coluna.name} {coluna.type.compile(dialect=db.engine.dialect)}'
+                if coluna.server_default is not None:
+                    padrao = coluna.server_default.arg
+                    padrao = padrao.text if hasattr(padrao, 'text') else f"'{padrao}'"
+                    definicao += f'{"" if coluna.nullable else " NOT NULL"} DEFAULT {padrao}'
+                conexao.execute(text(f'ALTER TABLE {tabela.name} ADD COLUMN {definicao}'))
+                print(f"✅ Coluna {tabela.name}.{coluna.name} adicionada!")
+
+def criar_indices():
+    """Cria em bancos já existentes os índices declarados nos modelos"""
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(bind=db.engine, checkfirst=True)
+
+def analisar_notebooks():
+    """Estatísticas dos índices de notebook para o planejador do SQLite escolher o do inventário.
+
+    Sem elas todo filtro parece seletivo, e um status comum com outra ordem
+    lê e ordena centenas de milhares de linhas; o ANALYZE completo só roda
+    enquanto a tabela não tem estatísticas, depois o PRAGMA optimize refaz
+    as que ficaram velhas (a tabela cresceu 25 vezes).
+    """
+    with db.engine.begin() as conexao:
+        if conexao.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).first() is None or \
+                conexao.execute(text("SELECT 1 FROM sqlite_stat1 WHERE tbl = 'notebook'")).first() is None:
+            conexao.execute(text("ANALYZE notebook"))
+        else:
+            conexao.execute(text("PRAGMA optimize=0x10002"))
+
 # Função para criar usuário admin
 def criar_admin():
     if not Usuario.query.filter_by(email='admin').first():
@@ -2848,6 +3158,43 @@ def init_database():
             db.create_all()
             print("✅ Tabelas criadas com sucesso!")
             
+            # ✅ Bancos antigos não ganham colunas nem índices novos pelo create_all
+            adicionar_colunas()
+            criar_indices()
+            analisar_notebooks()
+            print("✅ Índices verificados!")
+            
+            # ✅ Rollup mensal criado agora em um banco que já tem empréstimos
+            if EmprestimoMensal.query.first() is None and Emprestimo.query.first() is not None:
+                reconstruir_emprestimo_mensal()
+                print("✅ Rollup mensal preenchido!")
+            
+            # ✅ Busca textual: tabela virtual e gatilhos; preenchida se ainda estiver vazia.
+            # Sem FTS5 no SQLite o sistema sobe sem a busca, e os passos seguintes continuam
+            try:
+                criar_busca()
+                if db.session.execute(text("SELECT 1 FROM busca_fts LIMIT 1")).first() is None:
+                    registros = reconstruir_busca()
+                    if registros:
+                        print(f"✅ Índice de busca preenchido: {registros} registros")
+            except DatabaseError as e:
+                db.session.rollback()
+                print(f"⚠️ FTS5 indisponível, busca desativada: {e.orig}")
+            
+            # ✅ Contadores de empréstimos preenchidos antes que o verificador de atrasos os altere
+            if EmprestimoStatusContagem.query.first() is None and Emprestimo.query.first() is not None:
+                reconstruir_contagem_emprestimos()
+                print("✅ Contagem de empréstimos preenchida!")
+            
+            # ✅ Atrasos marcados já na subida, inclusive nos bancos que acabaram de ganhar a coluna
+            marcar_atrasados()
+            print("✅ Atrasos verificados!")
+            
+            # ✅ Contadores de status criados agora em um banco que já tem notebooks
+            if NotebookStatusContagem.query.first() is None and Notebook.query.first() is not None:
+                reconstruir_contagem_status()
+                print("✅ Contagem por status preenchida!")
+            
             # ✅ Verificar se as tabelas foram criadas
             from sqlalchemy import inspect
             inspector = inspect(db.engine)
@@ -2864,8 +3211,9 @@ def init_database():
             import traceback
             traceback.print_exc()
 
-# Inicializar o banco quando o app iniciar
+# Inicializar o banco e os assets quando o app iniciar
 init_database()
+gerar_assets()
 
 if __name__ == '__main__':
     # ⚠️ APENAS para desenvolvimento
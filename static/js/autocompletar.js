@@ -0,0 +1,125 @@
+// Campos com sugestões da API (/api/sugestoes/...); a opção escolhida vai para o campo oculto
+function iniciarAutocompletar(container) {
+    const campo = container.querySelector('input[type="text"]');
+    const oculto = container.querySelector('input[type="hidden"]');
+    const lista = container.querySelector('.autocompletar-opcoes');
+    const respostas = new Map();  // termo -> sugestões; apagar letras não refaz a consulta
+    let sugestoes = [];
+    let ativa = -1;
+    let espera = null;
+    let pedido = null;
+
+    function fechar() {
+        lista.classList.add('d-none');
+        lista.replaceChildren();
+        sugestoes = [];
+        ativa = -1;
+    }
+
+    function destacar(indice) {
+        ativa = indice;
+        Array.from(lista.children).forEach(function(opcao, i) {
+            opcao.classList.toggle('active', i === indice);
+        });
+    }
+
+    function escolher(sugestao) {
+        campo.value = sugestao.texto;
+        oculto.value = sugestao.id;
+        campo.classList.remove('is-invalid');
+        fechar();
+    }
+
+    function mostrar(novas) {
+        fechar();
+        sugestoes = novas;
+        if (!sugestoes.length) {
+            const vazio = document.createElement('div');
+            vazio.className = 'list-group-item text-muted small';
+            vazio.textContent = 'Nenhum resultado';
+            lista.appendChild(vazio);
+        }
+        sugestoes.forEach(function(sugestao) {
+            const opcao = document.createElement('button');
+            opcao.type = 'button';
+            opcao.className = 'list-group-item list-group-item-action';
+            opcao.textContent = sugestao.texto;
+            // mousedown acontece antes do blur do campo, que fecharia a lista
+            opcao.addEventListener('mousedown', function(evento) {
+                evento.preventDefault();
+                escolher(sugestao);
+            });
+            lista.appendChild(opcao);
+        });
+        lista.classList.remove('d-none');
+    }
+
+    function consultar(termo) {
+        if (respostas.has(termo)) {
+            mostrar(respostas.get(termo));
+            return;
+        }
+        // Só a resposta da última tecla interessa
+        if (pedido) {
+            pedido.abort();
+        }
+        pedido = new AbortController();
+        fetch(container.dataset.url + '?q=' + encodeURIComponent(termo),
+              {credentials: 'same-origin', headers: {'Accept': 'application/json'}, signal: pedido.signal})
+            .then(function(resposta) {
+                if (!resposta.ok) {
+                    throw new Error('Falha ao carregar sugestões: HTTP ' + resposta.status);
+                }
+                return resposta.json();
+            })
+            .then(function(dados) {
+                respostas.set(termo, dados.sugestoes);
+                if (campo.value.trim() === termo) {
+                    mostrar(dados.sugestoes);
+                }
+            })
+            .catch(function(erro) {
+                if (erro.name !== 'AbortError') {
+                    console.error(erro);
+                }
+            });
+    }
+
+    campo.addEventListener('input', function() {
+        oculto.value = '';
+        clearTimeout(espera);
+        const termo = campo.value.trim();
+        if (termo.length < 2) {
+            fechar();
+            return;
+        }
+        espera = setTimeout(function() { consultar(termo); }, 150);
+    });
+
+    campo.addEventListener('keydown', function(evento) {
+        if (!sugestoes.length) {
+            return;
+        }
+        if (evento.key === 'ArrowDown' || evento.key === 'ArrowUp') {
+            evento.preventDefault();
+            const passo = evento.key === 'ArrowDown' ? 1 : -1;
+            destacar((ativa + passo + sugestoes.length) % sugestoes.length);
+        } else if (evento.key === 'Enter' && ativa >= 0) {
+            evento.preventDefault();
+            escolher(sugestoes[ativa]);
+        } else if (evento.key === 'Escape') {
+            fechar();
+        }
+    });
+
+    campo.addEventListener('blur', fechar);
+
+    return {
+        // Marca o campo quando o texto digitado não corresponde a uma opção escolhida
+        validar: function() {
+            const valido = oculto.value !== '';
+            campo.classList.toggle('is-invalid', !valido);
+            return valido;
+        }
+    };
+}
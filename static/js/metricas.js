@@ -0,0 +1,34 @@
+// Métricas do dashboard e dos relatórios, carregadas depois que a página abre
+function valorMetrica(dados, caminho) {
+    return caminho.split('.').reduce(function(valor, chave) {
+        return valor == null ? valor : valor[chave];
+    }, dados);
+}
+
+function formatarMetrica(valor, formato) {
+    if (valor == null) {
+        return '-';
+    }
+    if (formato === 'valor') {
+        // Mesmo formato do filtro |valor dos templates
+        return Number(valor).toLocaleString('en-US', {minimumFractionDigits: 2, maximumFractionDigits: 2});
+    }
+    return valor;
+}
+
+// Busca as métricas e preenche os elementos [data-metrica]; devolve os dados para os gráficos
+function carregarMetricas(url) {
+    return fetch(url, {credentials: 'same-origin', headers: {'Accept': 'application/json'}})
+        .then(function(resposta) {
+            if (!resposta.ok) {
+                throw new Error('Falha ao carregar métricas: HTTP ' + resposta.status);
+            }
+            return resposta.json();
+        })
+        .then(function(dados) {
+            document.querySelectorAll('[data-metrica]').forEach(function(elemento) {
+                elemento.textContent = formatarMetrica(valorMetrica(dados, elemento.dataset.metrica), elemento.dataset.formato);
+            });
+            return dados;
+        });
+}